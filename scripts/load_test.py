@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Measure request latency against a running `indoorgml_converter serve`.
+
+    indoorgml_converter serve --port 8765 &
+    python scripts/load_test.py resources/building_sample.geojson -n 200 -c 4
+
+``--mode convert`` POSTs the whole building every time (a save without
+warm state); ``--mode update`` converts it once and then PATCHes one
+feature per request, as the editor does on an edit (only features with
+an id can be patched); ``--mode get`` only fetches the cached document.
+Prints latency percentiles and throughput.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def request(base, method, path, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("geojson", type=Path, help="Building to send")
+    p.add_argument("--url", default="http://127.0.0.1:8765", help="Server base URL")
+    p.add_argument("--mode", choices=("convert", "update", "get"), default="update")
+    p.add_argument("-n", "--requests", type=int, default=100, help="Requests to send")
+    p.add_argument("-c", "--concurrency", type=int, default=1, help="Parallel clients")
+    p.add_argument("--buildings", type=int, default=1,
+                   help="Distinct building ids to spread requests over")
+    args = p.parse_args(argv)
+
+    collection = json.loads(args.geojson.read_text(encoding="utf-8"))
+    features = collection["features"]
+    # the server matches upserts by id and rejects features without one
+    editable = [f for f in features
+                if f.get("id") is not None or (f.get("properties") or {}).get("id") is not None]
+    if args.mode == "update" and not editable:
+        sys.exit(f"{args.geojson} has no features with an id, so there is nothing "
+                 f"to update; use --mode convert or --mode get")
+    names = [f"load-{k}" for k in range(args.buildings)]
+    base = args.url.rstrip("/")
+
+    if args.mode != "convert":
+        for name in names:
+            status, _ = request(base, "POST", f"/buildings/{name}?format=json", collection)
+            if status != 200:
+                sys.exit(f"initial conversion of {name} failed: HTTP {status}")
+
+    def one(k):
+        name = names[k % len(names)]
+        if args.mode == "convert":
+            return request(base, "POST", f"/buildings/{name}?format=json", collection)
+        if args.mode == "update":
+            edit = {"upsert": [editable[k % len(editable)]]}
+            return request(base, "PATCH", f"/buildings/{name}?format=json", edit)
+        return request(base, "GET", f"/buildings/{name}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [t * 1000 for status, t in results if status == 200]
+    failed = len(results) - len(latencies)
+    print(f"{args.mode}: {len(results)} requests, {args.concurrency} clients, "
+          f"{elapsed:.2f}s, {len(results) / elapsed:.1f} req/s, {failed} failed")
+    if latencies:
+        print("latency ms: " + "  ".join(
+            f"p{q}={percentile(latencies, q):.1f}" for q in (50, 90, 99))
+            + f"  mean={statistics.mean(latencies):.1f}  max={max(latencies):.1f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
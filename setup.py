@@ -37,4 +37,10 @@ setup(
         "pandas",
         "shapely",
     ],
+    extras_require={
+        "fast": ["orjson"],
+        "arrow": ["pyarrow"],
+        "yaml": ["pyyaml"],
+        "zstd": ["zstandard"],
+    },
 )
\ No newline at end of file
@@ -1 +1,3 @@
 # Package initialization for indoorgml_converter
+
+__version__ = "0.1.0"
@@ -0,0 +1,129 @@
+# src/indoorgml_converter/batch.py
+
+import glob
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List
+
+from .converter import convert_features
+from .io_utils import FEATHER_SUFFIXES, PARQUET_SUFFIXES
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# files a directory input expands to
+INPUT_SUFFIXES = (".geojson", ".json") + PARQUET_SUFFIXES + FEATHER_SUFFIXES
+SUMMARY_NAME = "batch_summary.json"
+
+
+def collect_inputs(source) -> List[Path]:
+    """
+    Expand a batch ``source`` into input files, in a stable order.
+
+    A directory gives its GeoJSON/GeoParquet/Feather files, an existing
+    file with another suffix is a manifest (one path per line, relative
+    to the manifest, blank lines and ``#`` comments skipped) and anything
+    else is a glob pattern (``**`` allowed).
+    """
+    path = Path(source)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir()
+                      if p.is_file() and p.suffix.lower() in INPUT_SUFFIXES)
+    if path.is_file() and path.suffix.lower() not in INPUT_SUFFIXES:
+        lines = path.read_text(encoding="utf-8").splitlines()
+        entries = (line.strip() for line in lines)
+        return [path.parent / e for e in entries if e and not e.startswith("#")]
+    return sorted(Path(p) for p in glob.glob(str(source), recursive=True)
+                  if Path(p).is_file())
+
+
+def output_paths(inputs, output_dir: Path, suffix: str = ".gml") -> List[Path]:
+    """``<output_dir>/<input stem><suffix>`` per input; stems must be unique."""
+    outputs = [Path(output_dir) / (Path(p).stem + suffix) for p in inputs]
+    seen = {}
+    for src, out in zip(inputs, outputs):
+        if out in seen:
+            raise ValueError(f"{src} and {seen[out]} would both write {out}")
+        seen[out] = src
+    return outputs
+
+
+def convert_one(input_path: Path, output_path: Path, options: dict) -> dict:
+    """
+    Convert one file and describe the outcome; never raises.  ``options``
+    are convert() keyword arguments; no tables are printed.
+    """
+    options = dict(options)
+    output = {name: options.pop(name, None) for name in ("precision", "compress_level")}
+    visual = options.pop("visualize_output", False)
+    metrics = Metrics()
+    start = time.perf_counter()
+    error = None
+    try:
+        result = convert_features(input_path, metrics=metrics, **options)
+        result.write(output_path, **output)
+        if visual:
+            from .visualizer import visualize
+            visualize(result.cell_spaces, result.adjacency)
+    except Exception as e:
+        logger.debug("Conversion of %s failed", input_path, exc_info=True)
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "input": str(input_path),
+        "output": str(output_path),
+        "ok": error is None,
+        "seconds": round(time.perf_counter() - start, 3),
+        "counters": dict(metrics.counters),
+        "error": error,
+    }
+
+
+def run_batch(inputs, outputs, options: dict = None, jobs: int = None) -> List[dict]:
+    """
+    Convert ``inputs`` to ``outputs`` (see convert_one for ``options``)
+    on ``jobs`` worker processes, one file per task.  Workers import the
+    converter once and reuse it for every file they get.  Results come
+    back in input order; a failing file only fails its own entry.
+    """
+    options = dict(options or {})
+    jobs = jobs or 1
+    if jobs == 1 or len(inputs) < 2:
+        return [convert_one(i, o, options) for i, o in zip(inputs, outputs)]
+
+    results = [None] * len(inputs)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(convert_one, i, o, options): n
+                   for n, (i, o) in enumerate(zip(inputs, outputs))}
+        for done, future in enumerate(as_completed(futures), 1):
+            n = futures[future]
+            try:
+                results[n] = future.result()
+            except Exception as e:  # the worker itself died
+                results[n] = {"input": str(inputs[n]), "output": str(outputs[n]),
+                              "ok": False, "seconds": None, "counters": {},
+                              "error": f"{type(e).__name__}: {e}"}
+            logger.info("[%d/%d] %s %s", done, len(inputs),
+                        "ok" if results[n]["ok"] else "FAILED", inputs[n])
+    return results
+
+
+def summarize(results, seconds: float = None) -> dict:
+    """Run-level totals plus the per-file results."""
+    failed = [r for r in results if not r["ok"]]
+    return {
+        "files": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "seconds": seconds,
+        "cells": sum(r["counters"].get("cells", 0) for r in results),
+        "transitions": sum(r["counters"].get("transitions", 0) for r in results),
+        "results": list(results),
+    }
+
+
+def write_summary(summary: dict, path: Path) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2)
@@ -0,0 +1,118 @@
+# src/indoorgml_converter/cache.py
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from . import __version__
+
+logger = logging.getLogger(__name__)
+
+# where the CLI keeps the cache unless --cache-dir says otherwise
+CACHE_DIR_ENV = "INDOORGML_CACHE_DIR"
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def file_digest(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed on-disk cache of pipeline stage outputs.
+
+    Keys combine the input file's content hash, the converter version,
+    the stage name and the options that stage depends on; values are
+    pickled stage outputs, one file per key.  Reads refresh a file's
+    mtime and writes evict the least recently used files once the cache
+    grows past ``max_bytes``.  Entries are unpickled, so only point this
+    at a directory you trust.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(self, stage: str, digest: str, **options) -> str:
+        payload = json.dumps(
+            {"version": __version__, "stage": stage, "input": digest,
+             "options": options},
+            sort_keys=True, default=str,
+        )
+        return f"{stage}-{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def get(self, key: str):
+        """The cached value, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Dropping unreadable cache entry %s", path)
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        logger.debug("Cache hit %s", key)
+        return value
+
+    def put(self, key: str, value) -> None:
+        # write to a temp file first so readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.pkl"))
+
+    def evict(self) -> None:
+        """Remove least recently used entries until under ``max_bytes``."""
+        entries = []
+        for p in self.root.glob("*.pkl"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            logger.debug("Evicted cache entry %s", p.name)
+
+    def cached(self, key: str, compute):
+        """Return the value for ``key``, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+
+def run_stage(cache, digest: str, stage: str, compute, **options):
+    """``compute()`` through ``cache`` when there is one, directly otherwise."""
+    if cache is None:
+        return compute()
+    return cache.cached(cache.key(stage, digest, **options), compute)
@@ -1,41 +1,282 @@
 # src/indoorgml_converter/cli.py
 
-import argparse, sys, logging
+import argparse, os, sys, time, logging
 from pathlib import Path
-from .converter import convert
+from .batch import SUMMARY_NAME, collect_inputs, output_paths, run_batch, summarize, write_summary
+from .cache import CACHE_DIR_ENV, DEFAULT_MAX_BYTES
+from .converter import convert, existing_floor_files
+from .metrics import Metrics
+from .reports import report_format
+from .engines.semantic_engine import load_rules
+from .engines.topology_engine import DEFAULT_WALL_TOLERANCE, METHODS
+from .io_utils import LOADERS, load_features, save_features
 
 def setup_logging(verbose: bool):
     level = logging.DEBUG if verbose else logging.INFO
     logging.basicConfig(level=level,
                         format="%(asctime)s - %(levelname)s - %(message)s")
 
-def main():
+def _check_paths(args, log, existing=None):
+    """``existing``: outputs already on disk, if not just ``args.output``."""
+    if existing is None:
+        existing = [args.output] if args.output.exists() else []
+    if not args.input.exists() or not args.input.is_file():
+        log.error("Input missing or not a file: %s", args.input)
+        sys.exit(1)
+    if existing and not args.force:
+        log.error("Output exists (%s); use -f to overwrite.",
+                  ", ".join(str(p) for p in existing))
+        sys.exit(1)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+
+def _add_conversion_options(p):
+    """Options shared by the single-file and batch commands."""
+    p.add_argument("--by-floor",     action="store_true",
+                   help="Only connect cells on the same floor (+ stairs/elevators)")
+    p.add_argument("--topology",     choices=METHODS, default="strtree",
+                   help="Adjacency engine (default: strtree)")
+    p.add_argument("--wall-tolerance", type=float, default=DEFAULT_WALL_TOLERANCE,
+                   help="Vertex snapping step for --topology walls")
+    p.add_argument("--loader",       choices=LOADERS + ("stream",), default="gdal",
+                   help="GeoJSON reader: GDAL (default), pure-JSON fast path, "
+                        "or incremental streaming")
+    p.add_argument("--cache-dir",    type=Path, default=os.environ.get(CACHE_DIR_ENV),
+                   help=f"Cache parsed inputs and stage outputs here "
+                        f"(default: ${CACHE_DIR_ENV}, else no cache)")
+    p.add_argument("--cache-size",   type=int, default=DEFAULT_MAX_BYTES >> 20,
+                   help="Cache size limit in MB; least recently used entries go first")
+    p.add_argument("--no-cache",     action="store_true", help="Don't use the stage cache")
+    p.add_argument("--rules",        type=Path, default=None,
+                   help="JSON/YAML table overriding the floor/name/feature rules")
+    p.add_argument("--precision",    type=int, default=None,
+                   help="Round output coordinates to N decimals (default: full)")
+    p.add_argument("--compress-level", type=int, default=None,
+                   help="gzip (1-9) or zstd (1-22) level for compressed output")
+
+def _conversion_options(p, args, log):
+    """convert() keyword arguments for the shared options."""
+    if args.precision is not None and args.precision < 0:
+        p.error("--precision must be >= 0")
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except Exception as e:
+        log.error("Bad rule table %s: %s", args.rules, e)
+        sys.exit(1)
+    return dict(
+        by_floor         = args.by_floor,
+        topology         = args.topology,
+        wall_tolerance   = args.wall_tolerance,
+        loader           = args.loader,
+        cache_dir        = None if args.no_cache else args.cache_dir,
+        cache_max_bytes  = args.cache_size << 20,
+        rules            = rules,
+        precision        = args.precision,
+        compress_level   = args.compress_level,
+    )
+
+def convert_input_main(argv):
+    """`indoorgml_converter convert-input in.geojson out.parquet`"""
     p = argparse.ArgumentParser(
-        description="Convert GeoJSON → IndoorGML + floor-by-floor preview"
+        prog="indoorgml_converter convert-input",
+        description="Convert GeoJSON → GeoParquet/Feather for fast repeated reads"
     )
     p.add_argument("input",  type=Path, help="Path to .geojson input")
-    p.add_argument("output", type=Path, help="Path to .gml output")
+    p.add_argument("output", type=Path, help="Path to .parquet or .feather output")
     p.add_argument("-f","--force",   action="store_true", help="Overwrite output")
     p.add_argument("-v","--verbose", action="store_true", help="Verbose logging")
-    p.add_argument("--no-visual",    action="store_true", help="Skip preview")
+    p.add_argument("--loader",       choices=LOADERS, default="gdal",
+                   help="GeoJSON reader (default: gdal)")
 
-    args = p.parse_args()
+    args = p.parse_args(argv)
     setup_logging(args.verbose)
     log = logging.getLogger(__name__)
+    _check_paths(args, log)
 
-    if not args.input.exists() or not args.input.is_file():
-        log.error("Input missing or not a file: %s", args.input)
+    try:
+        gdf = load_features(args.input, loader=args.loader)
+        save_features(gdf, args.output)
+    except Exception:
+        log.exception("❌ Input conversion failed")
+        sys.exit(1)
+    log.info("Wrote %d features → %s", len(gdf), args.output)
+
+def batch_main(argv):
+    """`indoorgml_converter batch buildings/ out/ -j 8`"""
+    p = argparse.ArgumentParser(
+        prog="indoorgml_converter batch",
+        description="Convert many inputs → IndoorGML on a pool of worker processes"
+    )
+    p.add_argument("inputs", help="Directory, glob pattern (quote it) or manifest "
+                                  "file listing one input path per line")
+    p.add_argument("output_dir", type=Path, help="Directory for the .gml outputs")
+    p.add_argument("-f","--force",   action="store_true", help="Overwrite outputs")
+    p.add_argument("-v","--verbose", action="store_true", help="Verbose logging")
+    p.add_argument("-j","--jobs",    type=int, default=os.cpu_count(),
+                   help="Files converted in parallel (default: CPU count)")
+    p.add_argument("--suffix",       default=".gml",
+                   help="Output suffix, e.g. .gml.gz (default: .gml)")
+    p.add_argument("--summary",      type=Path, default=None,
+                   help=f"Summary JSON (default: OUTPUT_DIR/{SUMMARY_NAME})")
+    p.add_argument("--visual",       action="store_true",
+                   help="Show the preview for every file (off by default)")
+    _add_conversion_options(p)
+
+    args = p.parse_args(argv)
+    setup_logging(args.verbose)
+    log = logging.getLogger(__name__)
+    options = _conversion_options(p, args, log)
+    options["visualize_output"] = args.visual
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        log.error("No inputs found for %s", args.inputs)
         sys.exit(1)
-    if args.output.exists() and not args.force:
-        log.error("Output exists; use -f to overwrite.")
+    try:
+        outputs = output_paths(inputs, args.output_dir, args.suffix)
+    except ValueError as e:
+        log.error("%s", e)
         sys.exit(1)
-    args.output.parent.mkdir(parents=True, exist_ok=True)
+    existing = [o for o in outputs if o.exists()]
+    if existing and not args.force:
+        log.error("%d outputs exist (e.g. %s); use -f to overwrite.",
+                  len(existing), existing[0])
+        sys.exit(1)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    log.info("Converting %d files on %d workers", len(inputs), args.jobs or 1)
+    start = time.perf_counter()
+    results = run_batch(inputs, outputs, options, jobs=args.jobs)
+    summary = summarize(results, round(time.perf_counter() - start, 3))
+    summary_path = args.summary or args.output_dir / SUMMARY_NAME
+    write_summary(summary, summary_path)
+    log.info("%d/%d files converted in %.1fs; summary → %s", summary["succeeded"],
+             summary["files"], summary["seconds"], summary_path)
+    for r in results:
+        if not r["ok"]:
+            log.error("❌ %s: %s", r["input"], r["error"])
+    if summary["failed"]:
+        sys.exit(1)
+
+def serve_main(argv):
+    """`indoorgml_converter serve --port 8765`"""
+    from .server import (
+        DEFAULT_MAX_BUILDINGS, DEFAULT_MAX_CONCURRENT, DEFAULT_PORT,
+        ConversionService, make_server,
+    )
+    p = argparse.ArgumentParser(
+        prog="indoorgml_converter serve",
+        description="Local HTTP conversion server keeping buildings warm in memory"
+    )
+    p.add_argument("--host",         default="127.0.0.1", help="Bind address")
+    p.add_argument("--port",         type=int, default=DEFAULT_PORT,
+                   help=f"Port (default: {DEFAULT_PORT})")
+    p.add_argument("--max-buildings", type=int, default=DEFAULT_MAX_BUILDINGS,
+                   help="Buildings kept in memory; least recently used go first")
+    p.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT,
+                   help="Requests converting at once; the rest wait")
+    p.add_argument("--queue-timeout", type=float, default=30.0,
+                   help="Seconds a request waits for a slot before a 503")
+    p.add_argument("-v","--verbose", action="store_true", help="Verbose logging")
+    p.add_argument("--by-floor",     action="store_true",
+                   help="Only connect cells on the same floor (+ stairs/elevators)")
+    p.add_argument("--topology",     choices=METHODS, default="strtree",
+                   help="Adjacency engine (default: strtree; others rebuild on edits)")
+    p.add_argument("--wall-tolerance", type=float, default=DEFAULT_WALL_TOLERANCE,
+                   help="Vertex snapping step for --topology walls")
+    p.add_argument("--rules",        type=Path, default=None,
+                   help="JSON/YAML table overriding the floor/name/feature rules")
+
+    args = p.parse_args(argv)
+    setup_logging(args.verbose)
+    log = logging.getLogger(__name__)
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except Exception as e:
+        log.error("Bad rule table %s: %s", args.rules, e)
+        sys.exit(1)
+
+    service = ConversionService(args.max_buildings, by_floor=args.by_floor,
+                                topology=args.topology,
+                                wall_tolerance=args.wall_tolerance, rules=rules)
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.max_concurrent,
+                         args.queue_timeout)
+    log.info("Serving on http://%s:%d (Ctrl-C to stop)", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+COMMANDS = {
+    "convert-input": convert_input_main,
+    "batch":         batch_main,
+    "serve":         serve_main,
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
+    p = argparse.ArgumentParser(
+        description="Convert GeoJSON → IndoorGML + floor-by-floor preview",
+        epilog="Other commands: " + ", ".join(COMMANDS)
+               + " (run `indoorgml_converter <command> -h`)"
+    )
+    p.add_argument("input",  type=Path,
+                   help="Path to .geojson, .parquet or .feather input")
+    p.add_argument("output", type=Path,
+                   help="Path to .gml output (.gml.gz / .gml.zst to compress)")
+    p.add_argument("-f","--force",   action="store_true", help="Overwrite output")
+    p.add_argument("-v","--verbose", action="store_true", help="Verbose logging")
+    p.add_argument("--no-visual",    action="store_true", help="Skip preview")
+    p.add_argument("-j","--jobs",    type=int, default=None,
+                   help="Worker processes for topology and XML output (default: 1)")
+    _add_conversion_options(p)
+    p.add_argument("--split-floors", action="store_true",
+                   help="Write one file per floor plus OUTPUT's .index.json")
+    p.add_argument("--report",       type=Path, default=None,
+                   help="Write a per-cell report (.csv, .jsonl or .parquet)")
+    p.add_argument("--transition-report", type=Path, default=None,
+                   help="Write a per-transition report (.csv, .jsonl or .parquet)")
+    p.add_argument("--profile",      type=Path, default=None,
+                   help="Write per-stage time/memory and counters to this JSON file")
+    p.add_argument("--profile-stages", type=Path, default=None, metavar="DIR",
+                   help="Dump a cProfile <stage>.prof per stage into DIR")
+
+    args = p.parse_args(argv)
+    setup_logging(args.verbose)
+    log = logging.getLogger(__name__)
+    options = _conversion_options(p, args, log)
+    reports = {kind: path for kind, path in
+               (("cells", args.report), ("transitions", args.transition_report)) if path}
+    for path in reports.values():
+        try:
+            report_format(path)
+        except ValueError as e:
+            p.error(str(e))
+    _check_paths(args, log,
+                 existing_floor_files(args.output) if args.split_floors else None)
+    metrics = None
+    if args.profile or args.profile_stages:
+        metrics = Metrics(memory=args.profile is not None,
+                          profile_dir=args.profile_stages)
 
     ok = convert(
         geojson_path     = args.input,
         output_path      = args.output,
-        visualize_output = not args.no_visual
+        visualize_output = not args.no_visual,
+        workers          = args.jobs,
+        split_floors     = args.split_floors,
+        metrics          = metrics,
+        reports          = reports,
+        **options
     )
+    if args.profile:
+        metrics.write(args.profile)
+        log.info("Wrote stage metrics → %s", args.profile)
     if not ok:
         log.error("❌ Conversion failed")
         sys.exit(1)
@@ -1,18 +1,28 @@
+import glob
+import io
+import json
 import logging
+import os
 import re
 import math
 from pathlib import Path
-from xml.etree.ElementTree import ElementTree
 
-import pandas as pd
+import numpy as np
 
-from .io_utils import load_features
-from .engines.geometry_engine import build_cell_spaces
-from .engines.topology_engine import build_transitions
-from .engines.semantic_engine import attach_semantics
-from .engines.xml_generator import generate_indoor_gml
-from .visualizer import visualize
+from .cache import DEFAULT_MAX_BYTES, StageCache, file_digest, run_stage
+from .metrics import Metrics, stage
+from .io_utils import (
+    explode, features_to_gdf, is_arrow_input, load_features, open_output, stream_cell_spaces,
+)
+from .engines.geometry_engine import CellSpaceStore
+from .engines.topology_engine import (
+    DEFAULT_WALL_TOLERANCE, as_graph, build_adjacency, build_floor_adjacency,
+)
+from .engines.semantic_engine import attach_semantics, cell_level, cell_levels
+from .engines.xml_generator import write_indoor_gml
+from .reports import building_summary, print_summary, write_report
 
+# pandas (reports) and matplotlib (preview) are imported where they are used
 logger = logging.getLogger(__name__)
 # matches "1st", "2nd", "3rd", "4th", "-1st", etc.
 _ORD = re.compile(r'^\s*(\-?\d+)(?:st|nd|rd|th)?\s*$', re.IGNORECASE)
@@ -32,7 +42,31 @@ def _normalize_floor(v) -> str:
     return s or 'None'
 
 
-def detect_level(props: dict) -> str:
+def floor_sort_key(level: str) -> float:
+    """
+    Order floors: B (basement) first, G next, then numeric ones ("2",
+    "2.0" from float columns, "-3") by value, then the rest (key inf).
+    """
+    if level == 'B':
+        return -1
+    if level == 'G':
+        return 0
+    try:
+        key = float(level)
+    except (TypeError, ValueError):
+        return math.inf
+    return key if math.isfinite(key) else math.inf
+
+
+def _floor_rules(floor):
+    """The 'floor' section of a semantic rule table (default rules if None)."""
+    if floor is None:
+        from .engines.semantic_engine import DEFAULT_RULES
+        floor = DEFAULT_RULES['floor']
+    return floor
+
+
+def detect_level(props: dict, floor: dict = None) -> str:
     """
     Detect the floor of a space by collecting *all* possible indicators:
       1) explicit keys: floor_name, level_name,'floor_level', 'flevel', level, floor
@@ -44,44 +78,56 @@ def detect_level(props: dict) -> str:
       • if exactly one unique value → return it
       • if multiple → log a warning & pick the first
       • if none → return 'None'
+    ``floor`` is the 'floor' section of a semantic rule table and replaces
+    the key lists above (see semantic_engine.DEFAULT_RULES).
     """
-    logger.debug(f"detect_level props: {props!r}")
+    level, conflicting = _detect_level(props, floor)
+    if conflicting:
+        logger.warning("Conflicting floor values %s; choosing %s", conflicting, level)
+    return level
+
+
+def _detect_level(props: dict, floor: dict = None):
+    """detect_level without the warning: (level, the conflicting values or [])."""
+    logger.debug("detect_level props: %r", props)
+    floor = _floor_rules(floor)
     candidates = []
 
     # 1) explicit floor props (skip None or nan)
-    for key in ('floor_name', 'level_name','floor_level', 'flevel', 'level', 'floor'):
+    for key in floor['keys']:
         v = props.get(key)
         if v is None or (isinstance(v, float) and math.isnan(v)):
             continue
         candidates.append(_normalize_floor(v))
 
     # 1a) explicit min/max level
-    lowv = props.get('min_level')
-    highv = props.get('max_level')
+    lowv, highv = (props.get(key) for key in floor['range'] or (None, None))
     if lowv is not None and highv is not None \
        and not (isinstance(lowv, float) and math.isnan(lowv)) \
        and not (isinstance(highv, float) and math.isnan(highv)):
-        return f"{_normalize_floor(lowv)}-{_normalize_floor(highv)}"
+        return f"{_normalize_floor(lowv)}-{_normalize_floor(highv)}", []
 
     # 2) numeric z overrides everything (skip nan)
-    vz = props.get('z')
+    vz = props.get(floor['numeric']) if floor['numeric'] else None
     if isinstance(vz, (int, float)) and not (isinstance(vz, float) and math.isnan(vz)):
         if vz < 0:
-            return 'B'
+            return 'B', []
         if vz == 0:
-            return 'G'
-        return str(int(vz))
+            return 'G', []
+        return str(int(vz)), []
 
     # 3) substring-based keys (skip None or nan)
     for k, v in props.items():
         if v is None or (isinstance(v, float) and math.isnan(v)):
             continue
         kl = k.lower()
-        if any(w in kl for w in ('elevation', 'storey', 'story', 'z')):
+        if any(w in kl for w in floor['substrings']):
             candidates.append(_normalize_floor(v))
 
     # 4) catch any ordinal-like string
     for k, v in props.items():
+        if not floor['ordinal']:
+            break
         if v is None or (isinstance(v, float) and math.isnan(v)):
             continue
         m = _ORD.match(str(v))
@@ -92,19 +138,127 @@ def detect_level(props: dict) -> str:
     unique = list(dict.fromkeys(candidates))
     if not unique:
         logger.debug("No floor info found → 'None'")
-        return 'None'
-    if len(unique) > 1:
-        logger.warning("Conflicting floor values %s; choosing %s", unique, unique[0])
-    return unique[0]
+        return 'None', []
+    return unique[0], (unique if len(unique) > 1 else [])
+
+
+def _normalize_floors(s):
+    """_normalize_floor over a Series of str values."""
+    s = s.str.strip()
+    low = s.str.lower()
+    ordinal = s.str.extract(_ORD, expand=False)
+    out = ordinal.where(ordinal.notna(), s).where(s != '', 'None')
+    out[low.isin(('g', 'ground', '0'))] = 'G'
+    out[low.isin(('b', 'basement', '-1', '-2'))] = 'B'
+    return out
+
+
+def levels_from_columns(columns, data, indptr, cols, floor=None):
+    """
+    Columnar core of detect_levels, over CellSpaceStore-style data (see
+    CellSpaceStore.columnar): the property values ``data`` as a CSR
+    matrix (``indptr``, ``cols``), each row in key order.  Returns
+    ``(levels, conflicts)`` as numpy arrays.
+    """
+    import pandas as pd
+
+    floor = _floor_rules(floor)
+    n = len(indptr) - 1
+    levels = np.full(n, 'None', dtype=object)
+    conflicts = np.zeros(n, dtype=bool)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+
+    # every (row, column) value, row-major like the props dicts
+    flat = np.asarray(data, dtype=object)
+    valid = ~pd.isna(flat)
+    rows, cols, flat, pos = rows[valid], cols[valid], flat[valid], np.flatnonzero(valid)
+    text = pd.Series(flat, dtype=object).astype(str)
+
+    # candidate ranks: 1) explicit keys in key order, 3) substring-matched
+    # columns, then 4) ordinal-like values, both in key order
+    explicit = {key: k for k, key in enumerate(floor['keys'])}
+    n_exp = len(explicit)
+    rank_col = np.array([
+        explicit.get(col, n_exp
+                     if any(w in str(col).lower() for w in floor['substrings'])
+                     else -1)
+        for col in columns] or [-1])[cols]
+    normed = rank_col >= 0
+    rank_norm = np.where(rank_col < n_exp, rank_col, n_exp + pos)
+    if floor['ordinal']:
+        ordinal = text.str.extract(_ORD, expand=False)
+        is_ord = ordinal.notna().to_numpy()
+    else:
+        ordinal, is_ord = text, np.zeros(len(text), dtype=bool)
+
+    cand_rows = np.concatenate([rows[normed], rows[is_ord]])
+    cand_rank = np.concatenate([rank_norm[normed], n_exp + len(valid) + pos[is_ord]])
+    cand_vals = np.concatenate([
+        _normalize_floors(text[normed]).to_numpy(dtype=object),
+        ordinal[is_ord].to_numpy(dtype=object)])
+
+    order = np.lexsort((cand_rank, cand_rows))
+    cand_rows, cand_vals = cand_rows[order], cand_vals[order]
+    found, first = np.unique(cand_rows, return_index=True)
+    levels[found] = cand_vals[first]
+    conflicts[cand_rows[cand_vals != levels[cand_rows]]] = True
+
+    position = {col: k for k, col in enumerate(columns)}
+
+    def _column(name):
+        k = position.get(name)
+        if k is None:
+            return pd.Series([], dtype=object)
+        hit = rows[cols == k]
+        return pd.Series(flat[cols == k], index=hit, dtype=object)
+
+    # 2) numeric z overrides the candidates
+    if floor['numeric']:
+        z = _column(floor['numeric'])
+        z = z[z.map(lambda v: isinstance(v, (int, float)))].astype(float)
+        levels[z.index] = np.where(
+            z < 0, 'B', np.where(z == 0, 'G', z.astype('int64').astype(str)))
+        conflicts[z.index] = False
+
+    # 1a) explicit min/max level overrides everything
+    if floor['range']:
+        low, high = (_column(key) for key in floor['range'])
+        both = low.index.intersection(high.index)
+        levels[both] = (_normalize_floors(low[both].astype(str)) + '-'
+                        + _normalize_floors(high[both].astype(str))).to_numpy()
+        conflicts[both] = False
+
+    return levels, conflicts
+
+
+def detect_levels(gdf, floor=None):
+    """
+    Columnar detect_level: the level of every row of ``gdf`` in one pass.
+
+    Applies the same precedence as detect_level on each row's non-null
+    properties (the CellSpaceStore view) -- explicit keys, min/max_level,
+    numeric z, substring-matched columns, ordinal values -- but with
+    pandas string operations over all non-null values at once instead of
+    a Python call per feature.  Returns ``(levels, conflicts)``: a str
+    Series and a bool Series marking rows where detect_level would log
+    conflicting floor values.
+    """
+    import pandas as pd
+    from .engines.geometry_engine import _sparse_properties
+
+    columns, indptr, cols, data = _sparse_properties(gdf)
+    levels, conflicts = levels_from_columns(columns, data, indptr, cols, floor)
+    return (pd.Series(levels, index=gdf.index, dtype=object),
+            pd.Series(conflicts, index=gdf.index))
 
 
 def print_adjacency(cell_spaces, transitions):
-    adj = {cs['id']: [] for cs in cell_spaces}
-    for a, b in transitions:
-        adj[a].append(b)
+    import pandas as pd
+
+    graph = as_graph(cell_spaces, transitions)
     df = pd.DataFrame([
-        {'Room': r, 'Neighbors': ",".join(ns) or "-"}
-        for r, ns in adj.items()
+        {'Room': r, 'Neighbors': ",".join(graph.neighbors(r)) or "-"}
+        for r in dict.fromkeys(cs['id'] for cs in cell_spaces)
     ])
     print("\n=== Adjacency ===")
     print(df.to_string(index=False))
@@ -112,18 +266,17 @@ def print_adjacency(cell_spaces, transitions):
 
 
 def print_features(cell_spaces, transitions):
-    nbrs = {cs['id']: [] for cs in cell_spaces}
-    for a, b in transitions:
-        nbrs[a].append(b)
+    import pandas as pd
+
+    graph = as_graph(cell_spaces, transitions)
     rows = []
     for cs in cell_spaces:
         fid, props = cs['id'], cs['properties']
-        lvl = detect_level(props)
         rows.append({
             'ID': fid,
-            'Level': lvl,
+            'Level': cell_level(cs),
             'Name': props.get('name', '-'),
-            'Neighbors': ",".join(nbrs[fid]) or "-"
+            'Neighbors': ",".join(graph.neighbors(fid)) or "-"
         })
     df = pd.DataFrame(rows)
     print("\n=== Features ===")
@@ -131,34 +284,325 @@ def print_features(cell_spaces, transitions):
     return df
 
 
-def convert(geojson_path: Path,
-            output_path: Path,
-            visualize_output: bool = True) -> bool:
-    try:
-        logger.info("Loading GeoJSON from %s", geojson_path)
-        gdf = load_features(geojson_path)
+def _load_cells(geojson_path: Path, loader: str, cache=None, digest=None,
+                rules=None, metrics=None):
+    """Load features, build cell-spaces and attach semantics."""
+    if loader == "stream" and not is_arrow_input(geojson_path):
+        # semantics run chunk by chunk while the file is still parsing
+        logger.info("Streaming GeoJSON from %s", geojson_path)
+        cell_spaces = []
+        with stage(metrics, "stream"):
+            for chunk in stream_cell_spaces(geojson_path):
+                cell_spaces.extend(attach_semantics(chunk, rules=rules))
+        logger.info("Built %d cell-spaces", len(cell_spaces))
+        return cell_spaces
+
+    loader = "gdal" if loader == "stream" else loader
+
+    def _load():
+        logger.info("Loading features from %s", geojson_path)
+        return load_features(geojson_path, loader=loader)
+
+    with stage(metrics, "load"):
+        gdf = run_stage(cache, digest, "features", _load, loader=loader)
+    return _cells_from_gdf(gdf, rules, metrics)
+
+
+def _cells_from_gdf(gdf, rules=None, metrics=None):
+    """Cell-spaces with semantics for already loaded (exploded) features."""
+    if metrics:
+        metrics.count("features", len(gdf))
+
+    logger.info("Building %d cell-spaces", len(gdf))
+    with stage(metrics, "cells"):
+        cell_spaces = CellSpaceStore.from_gdf(gdf)
+
+    logger.info("Attaching semantics")
+    with stage(metrics, "semantics"):
+        attach_semantics(cell_spaces, rules=rules)
+    return cell_spaces
+
+
+def _split_name(output_path: Path):
+    """``out.gml.gz`` → ("out", ".gml.gz")."""
+    name = Path(output_path).name
+    cut = name.lower().find(".gml")
+    if cut <= 0:
+        cut = len(name)
+    return name[:cut], name[cut:]
 
-        logger.info("Building %d cell-spaces", len(gdf))
-        cell_spaces = build_cell_spaces(gdf)
 
-        logger.info("Attaching semantics")
-        attach_semantics(cell_spaces)
+def floor_output_path(output_path: Path, tag: str) -> Path:
+    """``out.gml.gz`` → ``out.<tag>.gml.gz``: the tag goes before ``.gml``."""
+    stem, suffix = _split_name(output_path)
+    return Path(output_path).with_name(f"{stem}.{tag}{suffix}")
 
-        logger.info("Building transitions")
-        transitions = build_transitions(cell_spaces)
 
-        logger.info("Generating IndoorGML XML")
-        root = generate_indoor_gml(cell_spaces, transitions)
-        tree = ElementTree(root)
-        tree.write(output_path, encoding="utf-8", xml_declaration=True)
+def floor_index_path(output_path: Path) -> Path:
+    """``out.gml.gz`` → ``out.index.json``."""
+    stem, _ = _split_name(output_path)
+    return Path(output_path).with_name(f"{stem}.index.json")
+
+
+def existing_floor_files(output_path: Path) -> list:
+    """
+    Files a split-floors run of ``output_path`` would overwrite: its index
+    and every ``<stem>.<tag><suffix>`` already on disk.  The tags depend
+    on the floors found, so any tag counts.
+    """
+    stem, suffix = _split_name(output_path)
+    parent = Path(output_path).parent
+    index = floor_index_path(output_path)
+    found = sorted(parent.glob(f"{glob.escape(stem)}.*{glob.escape(suffix)}"))
+    return ([index] if index.exists() else []) + [p for p in found if p != index]
+
+
+def write_floor_files(cell_spaces, transitions, output_path: Path,
+                      precision: int = None, workers: int = None,
+                      compress_level: int = None) -> Path:
+    """
+    Write one IndoorGML document per floor next to ``output_path`` (see
+    floor_output_path) plus a JSON index of the floors, their files and
+    the transitions that cross floors, so a consumer can load one floor
+    without reading the whole building (see floor_index_path).  Returns
+    the index path.
+    """
+    graph = as_graph(cell_spaces, transitions)
+    ids = graph.ids
+    levels = np.asarray(cell_levels(cell_spaces), dtype=object)
+    pi, pj = graph.index_pairs()
+    same = levels[pi] == levels[pj]
+
+    floors, used = [], set()
+    for lvl in sorted(set(levels.tolist()), key=lambda l: (floor_sort_key(l), l)):
+        members = np.flatnonzero(levels == lvl).tolist()
+        inside = same & (levels[pi] == lvl)
+        edges = [e for i, j in zip(pi[inside].tolist(), pj[inside].tolist())
+                 for e in ((ids[i], ids[j]), (ids[j], ids[i]))]
+
+        tag = re.sub(r'[^\w.-]+', '_', lvl) or 'None'
+        while tag in used:
+            tag += '_'
+        used.add(tag)
+        path = floor_output_path(output_path, tag)
+        with open_output(path, compress_level) as fh:
+            write_indoor_gml([cell_spaces[i] for i in members], edges, fh,
+                             precision=precision, workers=workers)
+        floors.append({'level': lvl, 'path': path.name,
+                       'cells': len(members), 'transitions': len(edges)})
+
+    index_path = floor_index_path(output_path)
+    cross = ~same
+    with open(index_path, 'w', encoding='utf-8') as fh:
+        json.dump({
+            'floors': floors,
+            'connections': [[ids[i], ids[j]] for i, j in
+                            zip(pi[cross].tolist(), pj[cross].tolist())],
+        }, fh, indent=2)
+    return index_path
+
+
+def cells_from_features(features, rules: dict = None, metrics: Metrics = None):
+    """
+    Cell-spaces with semantics for a GeoDataFrame or GeoJSON features (a
+    FeatureCollection or Feature dict, or an iterable of Feature dicts).
+    Multi-geometries are exploded as in load_features.
+    """
+    with stage(metrics, "load"):
+        if hasattr(features, "geometry"):
+            features = explode(features)
+        else:
+            features = features_to_gdf(features)
+    return _cells_from_gdf(features, rules, metrics)
+
+
+def build_topology(cell_spaces, by_floor: bool = False, topology: str = "strtree",
+                   workers: int = None,
+                   wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                   stats: dict = None):
+    """build_floor_adjacency with ``by_floor``, build_adjacency otherwise."""
+    logger.info("Building transitions")
+    if by_floor:
+        return build_floor_adjacency(cell_spaces, method=topology,
+                                     workers=workers,
+                                     wall_tolerance=wall_tolerance,
+                                     stats=stats)
+    return build_adjacency(cell_spaces, method=topology,
+                           workers=workers,
+                           wall_tolerance=wall_tolerance, stats=stats)
+
+
+class ConversionResult:
+    """
+    Cell-spaces, adjacency and levels of one converted building.
+
+    Nothing is written or printed until asked: xml_bytes() renders the
+    IndoorGML document in memory, write_xml() streams it to a binary file
+    handle and write() to a (compressed or per-floor) file; summary() and
+    write_report() give statistics and tabular reports (see reports).
+    ``metrics`` is the Metrics object the conversion filled in, if any,
+    and ``rules`` the semantic rule table it used.
+    """
+
+    def __init__(self, cell_spaces, adjacency, metrics: Metrics = None,
+                 rules: dict = None):
+        self.cell_spaces = cell_spaces
+        self.adjacency = as_graph(cell_spaces, adjacency)
+        self.metrics = metrics
+        self.rules = rules
+
+    @property
+    def levels(self) -> list:
+        """Normalized level of every cell, in cell order."""
+        return cell_levels(self.cell_spaces)
+
+    def summary(self) -> dict:
+        """Cells per floor, degrees, isolated cells, conflicts (see reports)."""
+        return building_summary(self.cell_spaces, self.adjacency, self.rules)
+
+    def write_report(self, path: Path, kind: str = "cells") -> int:
+        """Stream a full "cells" or "transitions" report to a CSV/JSONL/Parquet file."""
+        return write_report(self.cell_spaces, self.adjacency, path, kind)
+
+    def write_xml(self, fh, precision: int = None, workers: int = None) -> None:
+        """Stream the IndoorGML document to the binary handle ``fh``."""
+        with stage(self.metrics, "xml"):
+            write_indoor_gml(self.cell_spaces, self.adjacency, fh,
+                             precision=precision, workers=workers)
+
+    def xml_bytes(self, precision: int = None, workers: int = None) -> bytes:
+        """The IndoorGML document as bytes."""
+        buf = io.BytesIO()
+        self.write_xml(buf, precision, workers)
+        return buf.getvalue()
+
+    def write(self, output_path: Path, precision: int = None, workers: int = None,
+              compress_level: int = None, split_floors: bool = False) -> Path:
+        """
+        Write the document to ``output_path`` (compressed for .gz/.zst, see
+        io_utils.open_output), or one file per floor plus an index with
+        ``split_floors`` (see write_floor_files).  Returns the path written
+        (the index when split).
+        """
+        logger.info("Writing IndoorGML XML")
+        written = [Path(output_path)]
+        if split_floors:
+            with stage(self.metrics, "xml"):
+                output_path = write_floor_files(self.cell_spaces, self.adjacency,
+                                                output_path, precision, workers,
+                                                compress_level)
+            index = json.loads(Path(output_path).read_text(encoding="utf-8"))
+            written = [Path(output_path)] + [Path(output_path).parent / f["path"]
+                                             for f in index["floors"]]
+        else:
+            with open_output(output_path, compress_level) as fh:
+                self.write_xml(fh, precision, workers)
+        if self.metrics:
+            self.metrics.count("output_bytes", sum(p.stat().st_size for p in written))
+        return Path(output_path)
+
+
+def convert_features(source,
+                     by_floor: bool = False,
+                     workers: int = None,
+                     topology: str = "strtree",
+                     wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                     loader: str = "gdal",
+                     cache_dir: Path = None,
+                     cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                     rules: dict = None,
+                     metrics: Metrics = None) -> ConversionResult:
+    """
+    Build cell-spaces and their adjacency from ``source`` without writing
+    or printing anything; errors propagate.
+
+    ``source`` is an input path (see load_features; ``loader="stream"``
+    parses GeoJSON incrementally), a GeoDataFrame, or GeoJSON features (a
+    FeatureCollection or Feature dict, or an iterable of Feature dicts).
+    With ``cache_dir`` a path input's parsed features, cells and adjacency
+    are cached on disk, keyed by its content hash, the converter version
+    and the options each stage depends on.  ``rules`` is a semantic rule
+    table for attach_semantics (see semantic_engine.load_rules).
+    """
+    cache = digest = None
+    if isinstance(source, (str, os.PathLike)):
+        cache = StageCache(cache_dir, cache_max_bytes) if cache_dir else None
+        digest = file_digest(source) if cache else None
+        cell_spaces = run_stage(
+            cache, digest, "semantics",
+            lambda: _load_cells(source, loader, cache, digest, rules, metrics),
+            loader=loader, rules=rules,
+        )
+    else:
+        cell_spaces = cells_from_features(source, rules, metrics)
+    stats = {} if metrics else None
+
+    def _topology():
+        return build_topology(cell_spaces, by_floor, topology, workers,
+                              wall_tolerance, stats)
+
+    with stage(metrics, "topology"):
+        adjacency = run_stage(cache, digest, "topology", _topology, loader=loader,
+                              by_floor=by_floor, topology=topology,
+                              wall_tolerance=wall_tolerance, rules=rules)
+    result = ConversionResult(cell_spaces, adjacency, metrics, rules)
+
+    if metrics:
+        metrics.count("cells", len(cell_spaces))
+        for name, value in stats.items():
+            metrics.count(name, value)
+        metrics.count("transitions", len(result.adjacency))
+    return result
+
+
+def convert(geojson_path: Path,
+            output_path: Path,
+            visualize_output: bool = True,
+            by_floor: bool = False,
+            workers: int = None,
+            topology: str = "strtree",
+            wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+            loader: str = "gdal",
+            cache_dir: Path = None,
+            cache_max_bytes: int = DEFAULT_MAX_BYTES,
+            rules: dict = None,
+            precision: int = None,
+            compress_level: int = None,
+            split_floors: bool = False,
+            metrics: Metrics = None,
+            reports: dict = None) -> bool:
+    """
+    Convert ``geojson_path`` to IndoorGML at ``output_path``, print summary
+    statistics and optionally show the preview.
+
+    Options as in convert_features and ConversionResult.write; errors are
+    logged and give False.  ``reports`` maps a report kind ("cells",
+    "transitions") to the file to stream it to (see reports.write_report).
+    A Metrics object passed as ``metrics`` gets per-stage timings and run
+    counters filled in.
+    """
+    try:
+        result = convert_features(geojson_path, by_floor=by_floor, workers=workers,
+                                  topology=topology, wall_tolerance=wall_tolerance,
+                                  loader=loader, cache_dir=cache_dir,
+                                  cache_max_bytes=cache_max_bytes, rules=rules,
+                                  metrics=metrics)
+        output_path = result.write(output_path, precision=precision, workers=workers,
+                                   compress_level=compress_level,
+                                   split_floors=split_floors)
         print(f"\nConverted → {output_path}")
 
-        print_adjacency(cell_spaces, transitions)
-        print_features(cell_spaces, transitions)
+        with stage(metrics, "report"):
+            print_summary(result.cell_spaces, result.adjacency, rules)
+            for kind, path in (reports or {}).items():
+                rows = result.write_report(path, kind)
+                logger.info("Wrote %d-row %s report → %s", rows, kind, path)
 
         if visualize_output:
             logger.info("Launching floor-by-floor preview")
-            visualize(cell_spaces, transitions)
+            from .visualizer import visualize
+            with stage(metrics, "preview"):
+                visualize(result.cell_spaces, result.adjacency)
 
         logger.info("✅ Conversion complete")
         return True
@@ -166,6 +610,9 @@ def convert(geojson_path: Path,
     except Exception:
         logger.exception("❌ Conversion error")
         return False
+    finally:
+        if metrics:
+            metrics.close()
 
 # # src/indoorgml_converter/converter.py
 #
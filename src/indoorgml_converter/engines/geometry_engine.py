@@ -1,22 +1,395 @@
 # src/indoorgml_converter/engines/geometry_engine.py
 
+from collections.abc import MutableMapping
 from typing import List, Dict
+
+import numpy as np
 from shapely.geometry.base import BaseGeometry
 
-def build_cell_spaces(gdf) -> List[Dict]:
+
+def _cell_ids(gdf, ids, skip_null: bool) -> List[str]:
+    # Unique ID: use feature-id if present, otherwise index
+    if ids is None:
+        return [f"cell-{idx}" for idx in gdf.index]
+    if skip_null:
+        # a NaN id is truthy; treat it as missing too
+        return [str(fid) if fid == fid and fid else f"cell-{idx}"
+                for fid, idx in zip(ids, gdf.index)]
+    return [str(fid or f"cell-{idx}") for fid, idx in zip(ids, gdf.index)]
+
+
+def _property_columns(gdf):
+    """(column names, one object array per column) for the non-geometry columns."""
+    columns = [col for col in gdf.columns if col != "geometry"]
+    return columns, [gdf[col].to_numpy(dtype=object) for col in columns]
+
+
+def _sparse_properties(gdf):
+    """
+    The non-null property values of ``gdf`` in CSR layout: ``(columns,
+    indptr, cols, data)``, where row ``i`` has the values ``data[j]`` of
+    the columns ``cols[j]`` for ``j`` in ``indptr[i]:indptr[i+1]``, in
+    column order.  Columns are read one at a time and only their non-null
+    values are boxed, so nulls cost nothing.
+    """
+    import pandas as pd
+
+    columns = [col for col in gdf.columns if col != "geometry"]
+    n = len(gdf)
+    rows, cols, data = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int32)], \
+        [np.empty(0, dtype=object)]
+    for k, col in enumerate(columns):
+        present = pd.notna(gdf[col]).to_numpy()
+        rows.append(np.flatnonzero(present))
+        cols.append(np.full(len(rows[-1]), k, dtype=np.int32))
+        data.append(gdf[col][present].to_numpy(dtype=object))
+    rows, cols, data = np.concatenate(rows), np.concatenate(cols), np.concatenate(data)
+    order = np.lexsort((cols, rows))
+    indptr = np.searchsorted(rows[order], np.arange(n + 1))
+    return columns, indptr, cols[order], data[order]
+
+
+def _id_column(gdf):
+    return gdf["id"].to_numpy(dtype=object) if "id" in gdf.columns else None
+
+
+def build_cell_spaces(gdf, sparse: bool = False) -> List[Dict]:
     """
     From a GeoDataFrame, build a list of dicts:
       { 'id': str, 'geometry': shapely.geom, 'properties': {...} }
+
+    Ids, geometries and property columns are pulled out in bulk rather
+    than through one Series per row.  With ``sparse=True`` each cell only
+    keeps its non-null properties, so OSM exports with hundreds of mostly
+    empty tag columns don't carry a NaN per column per cell.
     """
-    cell_spaces = []
-    for idx, row in gdf.iterrows():
-        # Unique ID: use feature-id if present, otherwise index
-        fid = row.get("id") or f"cell-{idx}"
+    geoms = gdf.geometry.to_numpy()
+    cell_ids = _cell_ids(gdf, _id_column(gdf), skip_null=sparse)
+
+    if not sparse:
         # Gather all non-geometry columns as properties
-        props = {col: row[col] for col in gdf.columns if col != "geometry"}
-        cell_spaces.append({
-            "id": str(fid),
-            "geometry": row.geometry,
-            "properties": props
-        })
-    return cell_spaces
+        columns, values = _property_columns(gdf)
+        rows = zip(*values) if values else ((),) * len(gdf)
+        return [
+            {"id": fid, "geometry": geom, "properties": dict(zip(columns, row))}
+            for fid, geom, row in zip(cell_ids, geoms, rows)
+        ]
+
+    columns, indptr, cols, data = _sparse_properties(gdf)
+    names = [columns[k] for k in cols.tolist()]
+    data = data.tolist()
+    return [{"id": fid, "geometry": geom,
+             "properties": dict(zip(names[indptr[i]:indptr[i + 1]],
+                                    data[indptr[i]:indptr[i + 1]]))}
+            for i, (fid, geom) in enumerate(zip(cell_ids, geoms))]
+
+
+class CellProperties(MutableMapping):
+    """
+    Lazy view of one cell's non-null properties, read straight from the
+    store's columns.  A view never writes the columns: the first change
+    copies the cell's properties into a dict of its own, which the store
+    keeps and every later view of the cell reads.  Bulk updates go
+    through CellSpaceStore.assign instead.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row: int):
+        self._store = store
+        self._row = row
+
+    def _entries(self):
+        store, row = self._store, self._row
+        return slice(store._indptr[row], store._indptr[row + 1])
+
+    def _columns(self):
+        return self._store._cols[self._entries()].tolist()
+
+    def _own(self, create: bool = False):
+        own = self._store._overrides.get(self._row)
+        if own is None and create:
+            own = self._store._overrides[self._row] = dict(self.items())
+        return own
+
+    def __getitem__(self, key):
+        own = self._own()
+        if own is not None:
+            return own[key]
+        k = self._store._position.get(key)
+        columns = self._columns()
+        if k is None or k not in columns:
+            raise KeyError(key)
+        return self._store._data[self._entries().start + columns.index(k)]
+
+    def __iter__(self):
+        own = self._own()
+        if own is not None:
+            return iter(own)
+        columns = self._store.columns
+        return iter([columns[k] for k in self._columns()])
+
+    def __len__(self):
+        own = self._own()
+        return len(own) if own is not None else len(self._columns())
+
+    def items(self):
+        own = self._own()
+        if own is not None:
+            return own.items()
+        store, entries = self._store, self._entries()
+        return [(store.columns[k], v) for k, v in
+                zip(store._cols[entries].tolist(), store._data[entries])]
+
+    def __setitem__(self, key, value):
+        self._own(create=True)[key] = value
+        self._store._drop_level(self._row)
+
+    def __delitem__(self, key):
+        del self._own(create=True)[key]
+        self._store._drop_level(self._row)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class CellSpace:
+    """
+    One cell of a CellSpaceStore.  Reads like the cell dicts built by
+    build_cell_spaces: cs['id'], cs['geometry'], cs['properties'], plus
+    cs['level'] once a level has been detected (see cell_level).
+    """
+    __slots__ = ("_store", "_row")
+
+    KEYS = ("id", "geometry", "properties")
+
+    def __init__(self, store, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def store(self) -> "CellSpaceStore":
+        return self._store
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self._store.ids[self._row]
+        if key == "geometry":
+            return self._store.geometries[self._row]
+        if key == "properties":
+            return CellProperties(self._store, self._row)
+        if key == "level" and self._store.levels[self._row] is not None:
+            return self._store.levels[self._row]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "id":
+            self._store.ids[self._row] = value
+        elif key == "geometry":
+            self._store.geometries[self._row] = value
+        elif key == "properties":
+            self._store._overrides[self._row] = dict(value)
+            self._store._drop_level(self._row)
+        elif key == "level":
+            self._store.levels[self._row] = value
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def keys(self):
+        return self.KEYS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"CellSpace(id={self['id']!r}, geometry={self['geometry'].geom_type})"
+
+
+class CellSpaceStore:
+    """
+    Column-oriented container of cell spaces.
+
+    Ids, geometries and levels live in flat arrays.  The properties are
+    kept like a CSR matrix: only the non-null values, row after row, with
+    the column each one belongs to, so mostly empty tag columns cost no
+    memory per cell.  Indexing
+    or iterating yields ``__slots__`` CellSpace views, so the store can
+    be used wherever a list of cell dicts is expected; only cells whose
+    properties get changed (e.g. by attach_semantics) hold a dict.
+    ``conflicts`` flags the cells whose floor properties disagreed when
+    attach_semantics detected the levels with the ``floor`` rules (both
+    None until it ran).  Changing a cell's properties clears its cached
+    level and its conflict flag.
+    """
+
+    def __init__(self, ids, geometries, columns, indptr, cols, data, levels=None):
+        n = len(ids)
+        self.ids = list(ids)
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.levels = np.full(n, None, dtype=object) if levels is None \
+            else np.asarray(levels, dtype=object)
+        self.columns = list(columns)
+        self._position = {col: k for k, col in enumerate(self.columns)}
+        self._indptr = np.asarray(indptr, dtype=np.int64)
+        self._cols = np.asarray(cols, dtype=np.int32)
+        self._data = np.asarray(data, dtype=object)
+        self._overrides = {}
+        self.conflicts = None
+        self.floor = None
+
+    @classmethod
+    def from_gdf(cls, gdf) -> "CellSpaceStore":
+        """Same cells as build_cell_spaces(gdf, sparse=True)."""
+        return cls(_cell_ids(gdf, _id_column(gdf), skip_null=True),
+                   gdf.geometry.to_numpy(), *_sparse_properties(gdf))
+
+    @classmethod
+    def from_dicts(cls, cell_spaces) -> "CellSpaceStore":
+        """Store of a list of cell dicts' ids, geometries and non-null properties."""
+        import pandas as pd
+
+        position, rows, cols, data = {}, [], [], []
+        for i, cs in enumerate(cell_spaces):
+            for key, v in cs['properties'].items():
+                rows.append(i)
+                cols.append(position.setdefault(key, len(position)))
+                data.append(v)
+        values = np.empty(len(data), dtype=object)
+        values[:] = data
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int32)
+        keep = np.flatnonzero(pd.notna(values))
+        order = keep[np.lexsort((cols[keep], rows[keep]))]
+        n = len(cell_spaces)
+        indptr = np.searchsorted(rows[order], np.arange(n + 1))
+        return cls([cs['id'] for cs in cell_spaces], [cs.get('geometry') for cs in cell_spaces],
+                   list(position), indptr, cols[order], values[order])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> CellSpace:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return CellSpace(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield CellSpace(self, i)
+
+    def _drop_level(self, rows) -> None:
+        self.levels[rows] = None
+        if self.conflicts is not None:
+            self.conflicts[rows] = False
+
+    def _rows(self):
+        """Row of each entry of the CSR ``_cols``/``_data`` arrays."""
+        return np.repeat(np.arange(len(self)), np.diff(self._indptr))
+
+    def columnar(self):
+        """
+        ``(columns, data, indptr, cols)``: the property column names and
+        the properties as a CSR matrix -- cell ``i`` has the values
+        ``data[j]`` of the columns ``cols[j]`` for ``j`` in
+        ``indptr[i]:indptr[i+1]``.  Cells in overridden_rows read their
+        own dict instead.  Don't modify them.
+        """
+        return self.columns, self._data, self._indptr, self._cols
+
+    @property
+    def overridden_rows(self) -> List[int]:
+        """Rows of the cells that hold their own property dict, ascending."""
+        return sorted(self._overrides)
+
+    def column(self, name: str):
+        """
+        ``(values, present)`` of one property across all cells: an object
+        array (None where missing) and a bool mask of the cells that have it.
+        """
+        n = len(self)
+        values = np.full(n, None, dtype=object)
+        present = np.zeros(n, dtype=bool)
+        k = self._position.get(name)
+        if k is not None:
+            at = self._cols == k
+            rows = self._rows()[at]
+            present[rows] = True
+            values[rows] = self._data[at]
+        for row, own in self._overrides.items():
+            present[row] = name in own
+            values[row] = own.get(name)
+        return values, present
+
+    def assign(self, name: str, rows, values) -> None:
+        """
+        Set property ``name`` on the cells at ``rows`` in bulk, like
+        ``store[r]['properties'][name] = v`` for each pair: existing keys
+        keep their place and new ones go last.  Unlike the per-cell write
+        this changes the columns, so no cell gets materialized.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=object)
+        self._drop_level(rows)
+        own = np.array([r in self._overrides for r in rows.tolist()], dtype=bool)
+        for r, v in zip(rows[own].tolist(), values[own]):
+            self._overrides[r][name] = v
+        rows, values = rows[~own], values[~own]
+        if not len(rows):
+            return
+
+        n = len(self)
+        k = self._position.get(name)
+        if k is None:
+            k = self._position[name] = len(self.columns)
+            self.columns.append(name)
+
+        # overwrite the entries cells already have ...
+        entry = np.full(n, -1, dtype=np.int64)
+        at = np.flatnonzero(self._cols == k)
+        entry[self._rows()[at]] = at
+        has = entry[rows] >= 0
+        self._data[entry[rows[has]]] = values[has]
+
+        # ... and append one to the other cells' rows (the last value wins)
+        rows, values = rows[~has][::-1], values[~has][::-1]
+        new, last = np.unique(rows, return_index=True)
+        if len(new):
+            at = self._indptr[new + 1]
+            self._cols = np.insert(self._cols, at, k).astype(np.int32)
+            self._data = np.insert(self._data, at, values[last])
+            added = np.zeros(n + 1, dtype=np.int64)
+            added[new + 1] = 1
+            self._indptr = self._indptr + np.cumsum(added)
+
+    @property
+    def n_materialized(self) -> int:
+        """Cells that hold their own property dict."""
+        return len(self._overrides)
+
+    def to_dicts(self) -> List[Dict]:
+        """Plain list-of-dicts copy (the build_cell_spaces shape)."""
+        return [{"id": cs["id"], "geometry": cs["geometry"],
+                 "properties": dict(cs["properties"].items())} for cs in self]
+
+
+def cell_geometries(cell_spaces):
+    """Geometries of a cell list or store, in cell order."""
+    if isinstance(cell_spaces, CellSpaceStore):
+        return cell_spaces.geometries
+    return [cs["geometry"] for cs in cell_spaces]
+
+
+def cell_ids(cell_spaces) -> List[str]:
+    """Ids of a cell list or store, in cell order."""
+    if isinstance(cell_spaces, CellSpaceStore):
+        return cell_spaces.ids
+    return [cs["id"] for cs in cell_spaces]
@@ -19,41 +19,443 @@
 
 # src/indoorgml_converter/engines/semantic_engine.py
 
-def attach_semantics(cell_spaces, gdf=None):
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from .geometry_engine import CellSpace, CellSpaceStore
+
+logger = logging.getLogger(__name__)
+
+# How attach_semantics resolves floor, name and feature.  Users can swap
+# sections out with their own JSON/YAML table (see load_rules).
+#   floor:  detect_level's inputs -- explicit keys, a [min, max] range pair,
+#           a numeric key, key substrings, ordinal values -- and the keys
+#           back-filled with the detected level where they're None
+#   others: ``target`` gets the first source whose column is truthy (or,
+#           with ``match``, whose lowercased text is listed), taking the
+#           column's value or the source's ``value``, but only if the
+#           target is missing / falsy / None, as the source's ``when`` says
+DEFAULT_RULES = {
+    "floor": {
+        "keys": ["floor_name", "level_name", "floor_level", "flevel", "level", "floor"],
+        "range": ["min_level", "max_level"],
+        "numeric": "z",
+        "substrings": ["elevation", "storey", "story", "z"],
+        "ordinal": True,
+        "fill": ["floor_name", "level_name", "floor_level", "flevel", "floor", "level"],
+    },
+    "name": {
+        "target": "name",
+        "sources": [
+            {"column": "label", "when": "missing"},
+            {"column": "room_id", "when": "falsy"},
+            {"column": "ref", "when": "falsy"},
+        ],
+    },
+    "feature": {
+        "target": "feature",
+        "sources": [
+            {"column": "space_use", "when": "missing"},
+            {"column": "type", "when": "missing"},
+            {"column": "function", "when": "missing"},
+            {"column": "corridor", "match": ["yes", "true", "1"],
+             "value": "corridor", "when": "missing"},
+        ],
+    },
+}
+WHEN = ("missing", "falsy", "none")
+
+
+def _floor_normalizer(v):
+    from ..converter import _normalize_floor
+    return _normalize_floor(v)
+
+
+NORMALIZERS = {
+    "str": str,
+    "strip": lambda v: str(v).strip(),
+    "lower": lambda v: str(v).strip().lower(),
+    "floor": _floor_normalizer,
+}
+
+
+def merge_rules(rules=None) -> dict:
+    """DEFAULT_RULES with the sections of ``rules`` replacing them (null drops one)."""
+    merged = dict(DEFAULT_RULES)
+    for section, spec in (rules or {}).items():
+        if spec is None:
+            merged.pop(section, None)
+        elif section == "floor":
+            merged[section] = {**DEFAULT_RULES["floor"], **spec}
+        else:
+            merged[section] = spec
+    return merged
+
+
+def load_rules(path) -> dict:
+    """Read a rule table from .json or .yaml/.yml (needs pyyaml) over DEFAULT_RULES."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML rule tables need pyyaml (pip install pyyaml)") from None
+        rules = yaml.safe_load(text)
+    else:
+        rules = json.loads(text)
+    if not isinstance(rules, dict):
+        raise ValueError(f"{path}: a rule table maps section names to rules")
+    return merge_rules(rules)
+
+
+class _Source:
+    __slots__ = ("column", "match", "value", "when", "normalize")
+
+    def __init__(self, spec: dict):
+        unknown = set(spec) - {"column", "match", "value", "when", "normalize"}
+        if unknown or "column" not in spec:
+            raise ValueError(f"bad rule source {spec!r}")
+        self.column = spec["column"]
+        self.match = None if spec.get("match") is None \
+            else [str(m).lower() for m in spec["match"]]
+        self.value = spec.get("value")
+        self.when = spec.get("when", "missing")
+        if self.when not in WHEN:
+            raise ValueError(f"rule 'when' must be one of {WHEN}, not {self.when!r}")
+        name = spec.get("normalize")
+        if name is not None and name not in NORMALIZERS:
+            raise ValueError(f"unknown normalizer {name!r}; have {sorted(NORMALIZERS)}")
+        self.normalize = NORMALIZERS.get(name)
+
+    def hits(self, v) -> bool:
+        if self.match is not None:
+            return str(v).lower() in self.match
+        return bool(v)
+
+    def output(self, v):
+        v = v if self.value is None else self.value
+        return v if self.normalize is None else self.normalize(v)
+
+
+class _Resolver:
+    """One target property filled from an ordered list of sources."""
+    __slots__ = ("target", "sources")
+
+    def __init__(self, target: str, sources):
+        self.target = target
+        self.sources = sources
+
+    def _allowed(self, when: str, props: dict) -> bool:
+        if when == "missing":
+            return self.target not in props
+        if when == "falsy":
+            return not props.get(self.target)
+        return props.get(self.target) is None
+
+    def apply(self, props: dict) -> None:
+        for src in self.sources:
+            v = props.get(src.column)
+            if src.hits(v):
+                if self._allowed(src.when, props):
+                    props[self.target] = src.output(v)
+                return
+
+    def apply_store(self, store: CellSpaceStore) -> None:
+        n = len(store)
+        chosen = np.full(n, -1)
+        columns = []
+        for k, src in enumerate(self.sources):
+            values, present = store.column(src.column)
+            if src.match is not None:
+                hits = np.isin(np.array([str(v).lower() for v in values], dtype=object),
+                               src.match)
+            else:
+                hits = present & np.fromiter(map(bool, values), dtype=bool, count=n)
+            chosen[(chosen < 0) & hits] = k
+            columns.append(values)
+
+        target, has = store.column(self.target)
+        allowed = {
+            "missing": ~has,
+            "falsy": ~np.fromiter(map(bool, target), dtype=bool, count=n),
+            "none": target == None,  # noqa: E711 -- elementwise
+        }
+        rows, values = [], []
+        for k, src in enumerate(self.sources):
+            hit = np.flatnonzero((chosen == k) & allowed[src.when])
+            rows.append(hit)
+            values.extend(src.output(v) for v in columns[k][hit])
+        store.assign(self.target, np.concatenate(rows), values)
+
+
+class SemanticPlan:
     """
-    Back-fill each cell_space.props so that it has
-    'floor_name','level_name','floor_level', 'flevel','floor','level','name','feature' set.
+    A rule table compiled against one dataset's columns: the floor rules
+    keep only the keys that exist, and name/feature-style resolvers drop
+    sources whose column is absent.  ``apply`` runs it over a list of
+    cell dicts cell by cell, or over a CellSpaceStore column by column.
     """
+
+    def __init__(self, floor: dict, resolvers):
+        self.floor = floor
+        self.resolvers = resolvers
+
+    def apply(self, cell_spaces, gdf=None):
+        from ..converter import _detect_level, detect_level, detect_levels, levels_from_columns
+
+        floor, fill = self.floor, self.floor["fill"]
+        if isinstance(cell_spaces, CellSpaceStore):
+            return self._apply_store(cell_spaces, levels_from_columns, detect_level)
+
+        if gdf is not None:
+            levels, conflicts = detect_levels(gdf, floor)
+            levels, conflicts = levels.tolist(), conflicts.to_numpy()
+        else:
+            found = [_detect_level(cs['properties'], floor) for cs in cell_spaces]
+            levels = [lvl for lvl, _ in found]
+            conflicts = np.array([bool(values) for _, values in found], dtype=bool)
+        _warn_conflicts(conflicts)
+
+        for i, cs in enumerate(cell_spaces):
+            props = cs['properties']
+
+            # 1) FLOOR semantics
+            lvl = levels[i]
+            for key in fill:
+                if props.get(key) is None:
+                    props[key] = lvl
+
+            # 2) NAME / FEATURE / ... semantics
+            for resolver in self.resolvers:
+                resolver.apply(props)
+
+            # 3) record the level last: the writes above clear it
+            if isinstance(cs, CellSpace):
+                cs['level'] = lvl
+            else:
+                cs['properties'] = LevelProperties(props, lvl, bool(conflicts[i]), floor)
+        return cell_spaces
+
+    def _apply_store(self, store, levels_from_columns, detect_level):
+        floor = self.floor
+        levels, conflicts = levels_from_columns(*store.columnar(), floor)
+        for row in store.overridden_rows:
+            levels[row] = detect_level(store[row]['properties'], floor)
+            conflicts[row] = False
+        _warn_conflicts(conflicts)
+
+        for key in floor["fill"]:
+            values, _ = store.column(key)
+            rows = np.flatnonzero(values == None)  # noqa: E711 -- elementwise
+            store.assign(key, rows, levels[rows])
+        for resolver in self.resolvers:
+            resolver.apply_store(store)
+        store.levels[:] = levels
+        store.conflicts = conflicts
+        store.floor = floor
+        return store
+
+
+def _warn_conflicts(conflicts) -> None:
+    if conflicts.any():
+        logger.warning("Conflicting floor values in %d cells; chose the first "
+                       "of each", int(conflicts.sum()))
+
+
+def compile_rules(rules=None, columns=()) -> SemanticPlan:
+    """
+    Compile a rule table (DEFAULT_RULES if None; see merge_rules) against
+    the property columns of one dataset.
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    columns = set(columns)
+    # a table without a floor section detects nothing and fills nothing
+    spec = {**DEFAULT_RULES["floor"], **rules["floor"]} if rules.get("floor") \
+        else dict(keys=[], range=None, numeric=None, substrings=[], ordinal=False, fill=[])
+    unknown = set(spec) - set(DEFAULT_RULES["floor"])
+    if unknown:
+        raise ValueError(f"unknown floor rule keys: {sorted(unknown)}")
+    rng = spec["range"]
+    floor = {
+        "keys": [k for k in spec["keys"] if k in columns],
+        "range": rng if rng and all(k in columns for k in rng) else None,
+        "numeric": spec["numeric"] if spec["numeric"] in columns else None,
+        "substrings": [w for w in spec["substrings"]
+                       if any(w in str(c).lower() for c in columns)],
+        "ordinal": bool(spec["ordinal"]),
+        "fill": list(spec["fill"]),
+    }
+
+    resolvers = []
+    for section, spec in rules.items():
+        if section == "floor":
+            continue
+        if not isinstance(spec, dict) or "target" not in spec:
+            raise ValueError(f"rule section {section!r} needs a 'target' and 'sources'")
+        sources = [_Source(src) for src in spec.get("sources", ())]
+        sources = [src for src in sources
+                   if src.column in columns
+                   or (src.match is not None and "none" in src.match)]
+        if sources:
+            resolvers.append(_Resolver(spec["target"], sources))
+    return SemanticPlan(floor, resolvers)
+
+
+def _columns_of(cell_spaces):
+    if isinstance(cell_spaces, CellSpaceStore):
+        columns = list(cell_spaces.columns)
+        for row in cell_spaces.overridden_rows:
+            columns.extend(cell_spaces[row]['properties'])
+        return columns
+    return {k for cs in cell_spaces for k in cs['properties']}
+
+
+class LevelProperties(dict):
+    """
+    Properties of a plain cell dict after attach_semantics.  Besides the
+    values it remembers the detected ``level``, whether the floor values
+    ``conflict``-ed and the ``floor`` rules used.  Any write drops the
+    level and the conflict flag; cell_level then detects the level again
+    with the same rules.
+    """
+    __slots__ = ("level", "conflict", "floor")
+
+    def __init__(self, props=(), level=None, conflict=False, floor=None):
+        super().__init__(props)
+        self.level, self.conflict, self.floor = level, conflict, floor
+
+    def _forget(self):
+        self.level, self.conflict = None, False
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._forget()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._forget()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._forget()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        self._forget()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._forget()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._forget()
+
+
+def cell_level(cs) -> str:
+    """
+    Level of one cell, detected once and cached: on a CellSpaceStore cell
+    as cs['level'], on a plain cell dict in its LevelProperties.  Either
+    drops the cached value when the properties change and detects it
+    again with the floor rules attach_semantics ran with.  A plain dict
+    that attach_semantics never saw is detected with the default rules
+    every time.
+    """
+    from ..converter import detect_level
+
+    if isinstance(cs, CellSpace):
+        lvl = cs.get('level')
+        if lvl is None:
+            lvl = cs['level'] = detect_level(cs['properties'], cs.store.floor)
+        return lvl
+    props = cs['properties']
+    if not isinstance(props, LevelProperties):
+        return detect_level(props)
+    if props.level is None:
+        props.level = detect_level(props, props.floor)
+    return props.level
+
+
+def cell_levels(cell_spaces) -> list:
+    """Levels of a cell list or store, in cell order (see cell_level)."""
+    if isinstance(cell_spaces, CellSpaceStore):
+        levels = cell_spaces.levels
+        missing = [i for i, lvl in enumerate(levels) if lvl is None]
+        if missing:
+            from ..converter import detect_level
+            for i in missing:
+                levels[i] = detect_level(cell_spaces[i]['properties'], cell_spaces.floor)
+        return list(levels)
+    return [cell_level(cs) for cs in cell_spaces]
+
+
+def cell_conflicts(cell_spaces):
+    """
+    The conflict flags attach_semantics recorded (see LevelProperties and
+    CellSpaceStore.conflicts) as a bool array, or None when some cell
+    has none recorded.
+    """
+    if isinstance(cell_spaces, CellSpaceStore):
+        conflicts = cell_spaces.conflicts
+        return None if conflicts is None else conflicts.copy()
+    flags = []
     for cs in cell_spaces:
         props = cs['properties']
+        if not isinstance(props, LevelProperties):
+            return None
+        flags.append(props.conflict)
+    return np.array(flags, dtype=bool)
+
+
+def attach_semantics(cell_spaces, gdf=None, rules=None):
+    """
+    Back-fill each cell_space.props so that it has
+    'floor_name','level_name','floor_level', 'flevel','floor','level','name','feature' set,
+    and record the detected levels and floor conflicts (see cell_level and
+    cell_conflicts).
+
+    ``rules`` is a rule table (DEFAULT_RULES if None; see load_rules).  It
+    is compiled once against the cells' columns, then applied in bulk to a
+    CellSpaceStore; for a list of cell dicts, pass the GeoDataFrame they
+    were built from (same row order) as ``gdf`` to detect all levels at once.
+    """
+    plan = compile_rules(rules, _columns_of(cell_spaces))
+    return plan.apply(cell_spaces, gdf)
+
+
+def determine_feature_type(props: dict) -> str:
+    """
+    First look for a standardized 'feature' key (from attach_semantics),
+    but only treat door/corridor/stairs/elevator as special.
+    Everything else becomes 'room'.
+    """
+    f = props.get('feature')
+    if f:
+        f_low = str(f).lower()
+        if f_low in {'door', 'corridor', 'stairs', 'elevator'}:
+            return f_low
 
-        # 1) FLOOR semantics (unchanged)
-        from ..converter import detect_level
-        lvl = detect_level(props)
-        for key in ('floor_name', 'level_name','floor_level', 'flevel', 'floor', 'level'):
-            if props.get(key) is None:
-                props[key] = lvl
-
-        # 2) NAME semantics: standardize on props['name']
-        #    from .properties: label → name, room_id → name, ref → name
-        if props.get('label'):
-            props.setdefault('name', props['label'])
-        elif not props.get('name'):  # only if name is missing/falsey
-            if props.get('room_id'):
-                props['name'] = props['room_id']
-            elif props.get('ref'):
-                props['name'] = props['ref']
-
-        # 3) FEATURE semantics: standardize on props['feature']
-        #    from .properties: space_use/type/function, or corridor flag
-        if props.get('space_use'):
-            props.setdefault('feature', props['space_use'])
-        elif props.get('type'):
-            props.setdefault('feature', props['type'])
-        elif props.get('function'):
-            props.setdefault('feature', props['function'])
-        elif str(props.get('corridor')).lower() in ('yes', 'true', '1'):
-            props.setdefault('feature', 'corridor')
-        # else leave whatever 'feature' was, or empty
-
-    return cell_spaces
+    # Legacy keyword search (catches things like 'exit'→door, etc.)
+    txt = " ".join(str(v).lower() for v in props.values() if v is not None)
+    if any(w in txt for w in ('door', 'entrance', 'exit')):
+        return 'door'
+    if any(w in txt for w in ('corridor', 'hallway', 'passage')):
+        return 'corridor'
+    if any(w in txt for w in ('stair', 'steps')):
+        return 'stairs'
+    if any(w in txt for w in ('elevator', 'lift')):
+        return 'elevator'
+    return 'room'
@@ -1,18 +1,741 @@
 # src/indoorgml_converter/engines/topology_engine.py
 
+import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List, Tuple
 
-def build_transitions(cell_spaces) -> List[Tuple[str,str]]:
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+from .geometry_engine import cell_geometries, cell_ids
+from .semantic_engine import cell_levels
+
+METHODS = ("strtree", "bruteforce", "walls")
+# quantization step for the "walls" engine: 1e-7 degrees is about 1 cm,
+# the precision JOSM stores coordinates with
+DEFAULT_WALL_TOLERANCE = 1e-7
+# feature types that link a floor to the next one up
+CONNECTOR_TYPES = ("stairs", "elevator")
+# spatial tiles per worker when topology runs on a process pool
+TILES_PER_WORKER = 4
+
+
+def _count(stats, name: str, value: int) -> None:
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+
+def _touching_pairs_bruteforce(geoms, stats: dict = None) -> List[Tuple[int, int]]:
     """
-    Build a list of (from_id, to_id) whenever two cellSpaces touch.
+    Reference engine: test every pair (i < j) with ``touches``.  O(n²).
     """
-    transitions = []
-    n = len(cell_spaces)
+    pairs = []
+    n = len(geoms)
+    _count(stats, "candidate_pairs", n * (n - 1) // 2)
     for i in range(n):
         for j in range(i+1, n):
-            a = cell_spaces[i]
-            b = cell_spaces[j]
-            if a["geometry"].touches(b["geometry"]):
-                transitions.append((a["id"], b["id"]))
-                transitions.append((b["id"], a["id"]))
-    return transitions
+            if geoms[i].touches(geoms[j]):
+                pairs.append((i, j))
+    return pairs
+
+
+def _touching_pairs_strtree(geoms, stats: dict = None) -> List[Tuple[int, int]]:
+    """
+    Spatial-index engine: one bulk STRtree query for the bounding-box
+    candidates, then ``touches`` on each candidate pair (i < j) once.
+    Pairs come back as (i, j) with i < j, sorted like the brute-force loop.
+    """
+    if len(geoms) < 2:
+        return []
+    geoms = np.asarray(geoms, dtype=object)
+    src, dst = STRtree(geoms).query(geoms)
+    keep = src < dst
+    src, dst = src[keep], dst[keep]
+    _count(stats, "candidate_pairs", len(src))
+    hit = shapely.touches(geoms[src], geoms[dst])
+    src, dst = src[hit], dst[hit]
+    order = np.lexsort((dst, src))
+    return list(zip(src[order].tolist(), dst[order].tolist()))
+
+
+def shared_walls(geoms, tolerance: float = DEFAULT_WALL_TOLERANCE, stats: dict = None):
+    """
+    Find cells that share wall segments by hashing quantized edges.
+
+    Every polygon ring and linestring is cut into segments whose end
+    points are snapped to a ``tolerance`` grid and put in a canonical
+    order; segments with the same key are the same wall, so a single
+    grouping pass over all vertices joins the cells that share it.
+    Unlike ``touches`` this tolerates floating-point noise, but walls
+    must be split at the same vertices on both sides to match.
+
+    Returns (pairs, lengths): an (k, 2) array of index pairs (i < j),
+    sorted, and the total shared wall length of each pair.  A ``stats``
+    dict gets the (wall, cell pair) matches counted as "candidate_pairs".
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    empty = (np.empty((0, 2), dtype=np.int64), np.empty(0))
+    kinds = shapely.get_type_id(geoms)
+    polys = np.flatnonzero(kinds == 3)
+    lines = np.flatnonzero((kinds == 1) | (kinds == 2))
+    rings, ring_owner = shapely.get_rings(geoms[polys], return_index=True)
+    paths = np.concatenate((rings, geoms[lines]))
+    if not len(paths):
+        return empty
+    path_owner = np.concatenate((polys[ring_owner], lines))
+    coords, path_idx = shapely.get_coordinates(paths, return_index=True)
+
+    # segments join consecutive vertices of the same ring/line
+    same_path = path_idx[:-1] == path_idx[1:]
+    grid = np.round(coords / tolerance).astype(np.int64)
+    start, end = grid[:-1][same_path], grid[1:][same_path]
+    owner = path_owner[path_idx[:-1][same_path]]
+    length = np.hypot(*(coords[1:] - coords[:-1])[same_path].T)
+
+    # canonical direction, drop segments that collapse to a point
+    flip = (start[:, 0] > end[:, 0]) | ((start[:, 0] == end[:, 0]) & (start[:, 1] > end[:, 1]))
+    start[flip], end[flip] = end[flip], start[flip].copy()
+    solid = (start != end).any(axis=1)
+    if not solid.any():
+        return empty
+    keys = np.column_stack((start[solid], end[solid]))
+    owner, length = owner[solid], length[solid]
+
+    # join on the segment key; one entry per (wall, cell)
+    _, wall = np.unique(keys, axis=0, return_inverse=True)
+    wall = wall.ravel()
+    _, first = np.unique(np.column_stack((wall, owner)), axis=0, return_index=True)
+    wall, owner, length = wall[first], owner[first], length[first]
+
+    # walls seen by two or more cells give the adjacency
+    order = np.argsort(wall, kind="stable")
+    wall, owner, length = wall[order], owner[order], length[order]
+    bounds = np.flatnonzero(np.diff(wall)) + 1
+    starts = np.concatenate(([0], bounds))
+    sizes = np.diff(np.concatenate((starts, [len(wall)])))
+    two = starts[sizes == 2]
+    src, dst, lens = [owner[two]], [owner[two + 1]], [length[two]]
+    for b, size in zip(starts[sizes > 2].tolist(), sizes[sizes > 2].tolist()):
+        group = owner[b:b + size]
+        i, j = np.triu_indices(size, k=1)
+        src.append(group[i])
+        dst.append(group[j])
+        lens.append(np.full(len(i), length[b]))
+    src, dst, lens = (np.concatenate(a) for a in (src, dst, lens))
+    _count(stats, "candidate_pairs", len(src))
+    if not len(src):
+        return empty
+
+    # one row per cell pair with the summed wall length
+    pairs = np.column_stack((np.minimum(src, dst), np.maximum(src, dst)))
+    pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    return pairs, np.bincount(inverse.ravel(), weights=lens, minlength=len(pairs))
+
+
+def _tile_pairs(task):
+    """
+    Process-pool worker: ``task`` is (global indices, owned count, WKB).
+    The first ``owned`` geometries belong to the tile, the rest are its
+    halo; every owned geometry is tested against the whole tile.
+    """
+    index, owned, wkb = task
+    geoms = shapely.from_wkb(wkb)
+    src, dst = STRtree(geoms).query(geoms[:owned])
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    hit = shapely.touches(geoms[src], geoms[dst])
+    gi, gj = index[src[hit]], index[dst[hit]]
+    return np.column_stack((np.minimum(gi, gj), np.maximum(gi, gj))), len(src)
+
+
+def _tile_tasks(geoms, n_tiles: int):
+    """
+    Split the geometries into a grid of spatial tiles.  A geometry is owned
+    by the tile holding its bounding-box centre; the tile's halo is every
+    other geometry whose box meets the owned extent, so each touching pair
+    is seen by the tile of at least one of its members.
+    """
+    live = np.flatnonzero(~(shapely.is_missing(geoms) | shapely.is_empty(geoms)))
+    if len(live) < 2:
+        return []
+    bounds = shapely.bounds(geoms[live])
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+
+    side = max(1, int(math.ceil(math.sqrt(n_tiles))))
+    span_x = (cx.max() - cx.min()) or 1.0
+    span_y = (cy.max() - cy.min()) or 1.0
+    tx = np.minimum(((cx - cx.min()) / span_x * side).astype(int), side - 1)
+    ty = np.minimum(((cy - cy.min()) / span_y * side).astype(int), side - 1)
+    tile_of = tx * side + ty
+
+    boxes = STRtree(shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3]))
+    wkb = shapely.to_wkb(geoms[live])
+    tasks = []
+    for tile in np.unique(tile_of):
+        owned = np.flatnonzero(tile_of == tile)
+        extent = shapely.box(bounds[owned, 0].min(), bounds[owned, 1].min(),
+                             bounds[owned, 2].max(), bounds[owned, 3].max())
+        halo = np.setdiff1d(boxes.query(extent), owned)
+        local = np.concatenate((owned, halo))
+        tasks.append((live[local], len(owned), wkb[local]))
+    return tasks
+
+
+def _touching_pairs_parallel(geoms, workers: int, stats: dict = None) -> List[Tuple[int, int]]:
+    """
+    Spatially tiled STRtree engine on a process pool.  Geometries travel
+    to the workers as WKB; pairs found twice at tile seams are merged.
+    Candidates are counted per tile, so pairs at the seams count twice.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    if len(geoms) < 2:
+        return []
+    tasks = _tile_tasks(geoms, workers * TILES_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        found = list(pool.map(_tile_pairs, tasks))
+    _count(stats, "candidate_pairs", sum(n for _, n in found))
+    pairs = np.unique(np.concatenate([p for p, _ in found]
+                                     + [np.empty((0, 2), dtype=np.intp)]), axis=0)
+    return list(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+
+
+def touching_pairs(geoms, method: str = "strtree", workers: int = None,
+                   wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                   stats: dict = None) -> List[Tuple[int, int]]:
+    """
+    Return the (i, j) index pairs, i < j, of geometries that touch
+    (or, for the ``"walls"`` method, share a wall segment).
+
+    ``workers > 1`` spreads the strtree engine over a process pool; the
+    other engines always run in this process and ignore ``workers``.
+    A ``stats`` dict gets the number of pairs the engine actually tested
+    added to "candidate_pairs".
+    """
+    if method == "strtree":
+        if workers and workers > 1:
+            return _touching_pairs_parallel(geoms, workers, stats)
+        return _touching_pairs_strtree(geoms, stats)
+    if method == "walls":
+        pairs, _ = shared_walls(geoms, wall_tolerance, stats)
+        return list(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+    if method == "bruteforce":
+        return _touching_pairs_bruteforce(geoms, stats)
+    raise ValueError(f"Unknown topology method {method!r}; expected one of {METHODS}")
+
+
+class AdjacencyGraph:
+    """
+    Undirected cell adjacency in compressed sparse row (CSR) form.
+
+    ``ids`` is the id table (one entry per cell, in cell order); the
+    neighbours of cell ``i`` are ``indices[indptr[i]:indptr[i+1]]``,
+    sorted ascending.  Iterating the graph yields the same directed
+    (from_id, to_id) tuples, in the same order, as the old transition
+    list, so it can be passed anywhere a transition list was expected.
+    ``weights``, when present, runs parallel to ``indices`` (e.g. the
+    shared wall length found by the "walls" engine).
+    """
+
+    def __init__(self, ids, indptr, indices, weights=None):
+        self.ids = list(ids)
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self._index = None
+
+    @classmethod
+    def from_pairs(cls, ids, pairs, weights=None) -> "AdjacencyGraph":
+        """
+        Build from (i, j) index pairs; order doesn't matter and the first
+        occurrence of a repeated pair wins.
+        """
+        ids = list(ids)
+        n = len(ids)
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        loops = pairs[:, 0] == pairs[:, 1]
+        pairs = pairs[~loops]
+        rows = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        cols = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)[~loops]
+            weights = np.concatenate((weights, weights))
+        if len(rows):
+            key, first = np.unique(rows * n + cols, return_index=True)
+            rows, cols = key // n, key % n
+            if weights is not None:
+                weights = weights[first]
+        dtype = np.int32 if n < 2**31 else np.int64
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(ids, indptr, cols.astype(dtype), weights)
+
+    @classmethod
+    def from_transitions(cls, cell_spaces, transitions) -> "AdjacencyGraph":
+        """Build from a (from_id, to_id) list over ``cell_spaces``."""
+        ids = cell_ids(cell_spaces)
+        index = {}
+        for i, cid in enumerate(ids):
+            index.setdefault(cid, i)
+        pairs = [(index[a], index[b]) for a, b in transitions]
+        return cls.from_pairs(ids, pairs)
+
+    def __len__(self):
+        # number of directed transitions, like len() of the old list
+        return len(self.indices)
+
+    def __iter__(self):
+        return self.edges()
+
+    def __contains__(self, edge):
+        a, b = edge
+        index = self._id_index()
+        return any(j in index.get(b, ()) for i in index.get(a, ())
+                   for j in self.neighbor_indices(i))
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.ids)
+
+    def _id_index(self):
+        # id -> cell indices (ids repeat when multi-geometries were exploded)
+        if self._index is None:
+            self._index = {}
+            for i, cid in enumerate(self.ids):
+                self._index.setdefault(cid, []).append(i)
+        return self._index
+
+    def neighbor_indices(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbors(self, cell_id) -> List[str]:
+        """
+        Neighbour ids of every cell carrying ``cell_id``, in transition
+        order (the order the old per-id neighbour lists were built in).
+        """
+        cells = self._id_index().get(cell_id, ())
+        if len(cells) == 1:
+            return [self.ids[j] for j in self.neighbor_indices(cells[0]).tolist()]
+        edges = [(min(i, j), max(i, j), j)
+                 for i in cells for j in self.neighbor_indices(i).tolist()]
+        return [self.ids[j] for _, _, j in sorted(edges)]
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def degree(self, cell_id) -> int:
+        return sum(int(self.indptr[i + 1] - self.indptr[i])
+                   for i in self._id_index().get(cell_id, ()))
+
+    def index_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Each undirected edge once, as (i, j) arrays with i < j, sorted."""
+        rows = np.repeat(np.arange(self.n_cells), self.degrees())
+        keep = rows < self.indices
+        return rows[keep], self.indices[keep]
+
+    def pair_weights(self) -> np.ndarray:
+        """Weights aligned with index_pairs(), or None."""
+        if self.weights is None:
+            return None
+        rows = np.repeat(np.arange(self.n_cells), self.degrees())
+        return self.weights[rows < self.indices]
+
+    def weight(self, a, b):
+        """Weight of the edge between cell ids ``a`` and ``b`` (None if absent)."""
+        if self.weights is None:
+            return None
+        index = self._id_index()
+        for i in index.get(a, ()):
+            start = self.indptr[i]
+            for k, j in enumerate(self.neighbor_indices(i).tolist()):
+                if self.ids[j] == b:
+                    return float(self.weights[start + k])
+        return None
+
+    def edges(self):
+        """Yield directed (from_id, to_id) pairs: (a, b) then (b, a) per edge."""
+        ids = self.ids
+        for i, j in zip(*(a.tolist() for a in self.index_pairs())):
+            yield ids[i], ids[j]
+            yield ids[j], ids[i]
+
+    def to_transitions(self) -> List[Tuple[str,str]]:
+        return list(self.edges())
+
+
+def as_graph(cell_spaces, transitions) -> AdjacencyGraph:
+    """Accept either an AdjacencyGraph or a legacy transition list."""
+    if isinstance(transitions, AdjacencyGraph):
+        return transitions
+    return AdjacencyGraph.from_transitions(cell_spaces, transitions)
+
+
+def build_adjacency(cell_spaces, method: str = "strtree", workers: int = None,
+                    wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                    stats: dict = None) -> AdjacencyGraph:
+    """
+    Build the AdjacencyGraph of touching cellSpaces.
+
+    ``method`` picks the adjacency engine: ``"strtree"`` (default) uses a
+    spatial index, ``"bruteforce"`` keeps the original all-pairs loop as a
+    reference, and ``"walls"`` joins cells on shared wall segments
+    snapped to ``wall_tolerance`` (edge weights = shared wall length).
+    ``workers > 1`` computes the strtree adjacency tile by tile on a
+    process pool; the result is identical to the single-process one.
+    The other engines run single-process whatever ``workers`` says.
+    A ``stats`` dict gets "candidate_pairs" added (see touching_pairs).
+    """
+    geoms = cell_geometries(cell_spaces)
+    ids = cell_ids(cell_spaces)
+    if method == "walls":
+        pairs, lengths = shared_walls(geoms, wall_tolerance, stats)
+        return AdjacencyGraph.from_pairs(ids, pairs, lengths)
+    return AdjacencyGraph.from_pairs(ids, touching_pairs(geoms, method, workers,
+                                                         stats=stats))
+
+
+def build_transitions(cell_spaces, method: str = "strtree", workers: int = None,
+                      wall_tolerance: float = DEFAULT_WALL_TOLERANCE) -> List[Tuple[str,str]]:
+    """
+    Build a list of (from_id, to_id) whenever two cellSpaces touch.
+    See build_adjacency for the options.
+    """
+    return build_adjacency(cell_spaces, method, workers, wall_tolerance).to_transitions()
+
+
+def _vertical_pairs(cell_spaces, levels, geoms,
+                    tolerance: float = 0.0) -> List[Tuple[int, int]]:
+    """
+    Link stairs/elevator cells on consecutive floors whose footprints
+    overlap (or lie within ``tolerance`` of each other).  Only floors with
+    a known order (B, G, numeric) take part.
+    """
+    from ..converter import floor_sort_key
+    from .semantic_engine import determine_feature_type
+
+    # connectors[level][kind] -> cell indices
+    connectors = {}
+    for i, cs in enumerate(cell_spaces):
+        kind = determine_feature_type(cs["properties"])
+        if kind in CONNECTOR_TYPES:
+            connectors.setdefault(levels[i], {}).setdefault(kind, []).append(i)
+
+    ordered = sorted((lvl for lvl in set(levels) if math.isfinite(floor_sort_key(lvl))),
+                     key=lambda lvl: (floor_sort_key(lvl), lvl))
+    pairs = []
+    for lower, upper in zip(ordered, ordered[1:]):
+        for kind, below in connectors.get(lower, {}).items():
+            above = connectors.get(upper, {}).get(kind)
+            if not above:
+                continue
+            tree = STRtree([geoms[k] for k in above])
+            query = [geoms[k] for k in below]
+            if tolerance > 0:
+                src, dst = tree.query(query, predicate="dwithin", distance=tolerance)
+            else:
+                src, dst = tree.query(query, predicate="intersects")
+            for s, d in zip(src.tolist(), dst.tolist()):
+                i, j = below[s], above[d]
+                pairs.append((min(i, j), max(i, j)))
+    return pairs
+
+
+def build_floor_adjacency(cell_spaces, levels=None, method: str = "strtree",
+                          workers: int = None,
+                          connector_tolerance: float = 0.0,
+                          wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                          stats: dict = None) -> AdjacencyGraph:
+    """
+    Floor-partitioned variant of build_adjacency.
+
+    Cells are grouped by their detected level and adjacency only runs
+    inside each floor, so stacked footprints never produce false edges.
+    Cross-floor transitions come only from stairs/elevator cells matched
+    between consecutive levels.  ``levels`` defaults to the cells' cached
+    levels (see cell_levels); ``workers > 1`` runs the floors on a thread
+    pool (shapely releases the GIL while querying).  ``stats`` as in
+    build_adjacency, summed over the floors.
+    """
+    if levels is None:
+        levels = cell_levels(cell_spaces)
+    geoms = cell_geometries(cell_spaces)
+
+    floors = {}
+    for i, lvl in enumerate(levels):
+        floors.setdefault(lvl, []).append(i)
+
+    def _floor_pairs(members):
+        # per-floor counters, summed below: the floors may run on threads
+        floor_stats = {}
+        local = touching_pairs([geoms[k] for k in members], method,
+                               wall_tolerance=wall_tolerance, stats=floor_stats)
+        return [(members[i], members[j]) for i, j in local], floor_stats
+
+    groups = list(floors.values())
+    if workers and workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            per_floor = list(pool.map(_floor_pairs, groups))
+    else:
+        per_floor = [_floor_pairs(g) for g in groups]
+
+    for _, floor_stats in per_floor:
+        for name, value in floor_stats.items():
+            _count(stats, name, value)
+    pairs = [p for floor_pairs, _ in per_floor for p in floor_pairs]
+    pairs += _vertical_pairs(cell_spaces, levels, geoms, connector_tolerance)
+    return AdjacencyGraph.from_pairs(cell_ids(cell_spaces), pairs)
+
+
+def build_floor_transitions(cell_spaces, levels=None, method: str = "strtree",
+                            workers: int = None,
+                            connector_tolerance: float = 0.0,
+                            wall_tolerance: float = DEFAULT_WALL_TOLERANCE) -> List[Tuple[str,str]]:
+    """
+    Transition-list form of build_floor_adjacency.
+    """
+    return build_floor_adjacency(cell_spaces, levels, method, workers,
+                                 connector_tolerance, wall_tolerance).to_transitions()
+
+
+def _part_keys(ids) -> List[Tuple[str, int]]:
+    """
+    (id, n) per cell, n counting earlier cells with the same id, so the
+    parts of an exploded multi-geometry stay distinguishable.
+    """
+    seen = {}
+    keys = []
+    for cid in ids:
+        n = seen.get(cid, 0)
+        seen[cid] = n + 1
+        keys.append((cid, n))
+    return keys
+
+
+class SpatialIndex:
+    """
+    Persistent spatial index over cells, keyed by cell id, that can be
+    kept between incremental topology updates.
+
+    shapely's STRtree is immutable, so edits are recorded beside it:
+    replaced or deleted entries are masked out of the tree and new
+    geometries go to a small overflow that is tested directly.  The tree
+    is rebuilt once the overflow outgrows ``rebuild_ratio`` of the index.
+
+    The index also remembers the row of every part in the cell list.
+    Parts hold a fixed slot and the slot -> row table is a numpy array,
+    so shifting rows after an edit (remap) needs no Python loop.
+    """
+
+    def __init__(self, cell_spaces=(), rebuild_ratio: float = 0.1):
+        self.rebuild_ratio = rebuild_ratio
+        self._geoms = {}
+        self._parts = {}
+        keys = _part_keys(cell_ids(cell_spaces))
+        for key, cs in zip(keys, cell_spaces):
+            self._geoms[key] = cs["geometry"]
+            self._parts.setdefault(key[0], []).append(key)
+        self._slot = {key: i for i, key in enumerate(keys)}
+        self._slot_row = np.arange(len(keys), dtype=np.int64)
+        self.rebuild()
+
+    def __len__(self):
+        return len(self._geoms)
+
+    def __contains__(self, cell_id):
+        return cell_id in self._parts
+
+    def rebuild(self):
+        """Fold every pending edit into a fresh STRtree."""
+        self._tree_keys = list(self._geoms)
+        self._tree = STRtree([self._geoms[k] for k in self._tree_keys])
+        self._stale = set()
+        self._extra = {}
+        # compact the slots of deleted parts away
+        rows = self._slot_row[[self._slot[k] for k in self._tree_keys]]
+        self._slot = {key: i for i, key in enumerate(self._tree_keys)}
+        self._slot_row = rows.astype(np.int64)
+
+    def rows(self, cell_id) -> List[int]:
+        """Rows of the parts of ``cell_id`` in the cell list."""
+        return [int(self._slot_row[self._slot[key]])
+                for key in self._parts.get(cell_id, ())]
+
+    def remap(self, new_row: np.ndarray):
+        """Move every part from row r to ``new_row[r]``."""
+        live = self._slot_row >= 0
+        self._slot_row[live] = new_row[self._slot_row[live]]
+
+    def remove(self, cell_id):
+        """Drop every part of ``cell_id``."""
+        for key in self._parts.pop(cell_id, ()):
+            del self._geoms[key]
+            self._slot_row[self._slot.pop(key)] = -1
+            self._stale.add(key)
+            self._extra.pop(key, None)
+
+    def insert(self, key, geometry, row: int = -1):
+        """Add (or replace) the cell part ``key`` = (id, n), at ``row``."""
+        if key in self._geoms:
+            self._stale.add(key)
+        else:
+            self._parts.setdefault(key[0], []).append(key)
+        if key not in self._slot:
+            self._slot[key] = len(self._slot_row)
+            self._slot_row = np.append(self._slot_row, -1)
+        self._slot_row[self._slot[key]] = row
+        self._geoms[key] = geometry
+        self._extra[key] = geometry
+        if len(self._extra) > max(64, self.rebuild_ratio * len(self._geoms)):
+            self.rebuild()
+
+    def query(self, geometry, predicate: str = "touches") -> List[Tuple[str, int]]:
+        """Keys of the indexed cells for which ``predicate`` holds."""
+        hits = [self._tree_keys[k]
+                for k in self._tree.query(geometry, predicate=predicate).tolist()]
+        hits = [key for key in hits if key not in self._stale]
+        if self._extra:
+            keys = list(self._extra)
+            test = getattr(shapely, predicate)
+            found = test(geometry, np.asarray(list(self._extra.values()), dtype=object))
+            hits += [keys[k] for k in np.flatnonzero(found).tolist()]
+        return hits
+
+    def query_rows(self, geometry, predicate: str = "touches") -> np.ndarray:
+        """Rows of the indexed cells for which ``predicate`` holds."""
+        slots = [self._slot[key] for key in self.query(geometry, predicate)]
+        return self._slot_row[slots]
+
+
+def _edit_layout(cell_spaces, old_rows: dict, n_old: int, modified, added):
+    """
+    Where an edit put the cells: the old -> new row map (-1 for the
+    affected rows) and the (row, key) of every added or modified part.
+    Expects the layout Building.update produces: removed ids dropped,
+    the parts of a modified id where its first old part was, added ids
+    appended.
+    """
+    keep = np.ones(n_old, dtype=bool)
+    for rows in old_rows.values():
+        keep[rows] = False
+    kept_before = np.cumsum(keep) - keep
+    inserted = np.zeros(n_old, dtype=np.int64)
+    changed, shift = [], 0
+    for first, cid in sorted((min(old_rows[cid]), cid) for cid in modified):
+        pos = int(kept_before[first]) + shift
+        count = 0
+        while (pos + count < len(cell_spaces)
+               and cell_spaces[pos + count]["id"] == cid):
+            changed.append((pos + count, (cid, count)))
+            count += 1
+        if not count:
+            raise ValueError(f"modified cell {cid!r} is not where it was")
+        inserted[first] = count
+        shift += count
+    new_row = np.where(keep, kept_before + np.cumsum(inserted) - inserted, -1)
+
+    seen = {}
+    for row in range(int(keep.sum()) + shift, len(cell_spaces)):
+        cid = cell_spaces[row]["id"]
+        if cid not in added:
+            raise ValueError(f"cell {cid!r} at row {row} is not an added cell")
+        seen[cid] = seen.get(cid, 0) + 1
+        changed.append((row, (cid, seen[cid] - 1)))
+    if len(seen) != len(added):
+        missing = sorted(set(added) - set(seen))
+        raise ValueError(f"added cells missing from the end of the list: {missing}")
+    return new_row, changed
+
+
+def update_adjacency(cell_spaces, graph: AdjacencyGraph, added=(), removed=(),
+                     modified=(), index: SpatialIndex = None) -> AdjacencyGraph:
+    """
+    Update ``graph`` after an edit instead of rebuilding it.
+
+    ``cell_spaces`` is the edited cell list and ``graph`` the adjacency
+    of the list before the edit; the edit keeps the untouched cells in
+    order, puts the parts of a modified id where its first old part was
+    and appends the added ids (as server.Building.update does).  Only
+    the added and modified cells are re-tested, against ``index``, and
+    their rows are spliced into the carried-over CSR.  Pass the same
+    SpatialIndex on every call (its rows are updated in place) so the
+    work stays proportional to the edit; without one a fresh index is
+    built from ``cell_spaces``.  Cells sharing an id are updated
+    together.  Uses the ``touches`` predicate, like the strtree engine,
+    so the result equals build_adjacency on the edited list.
+    """
+    added, modified = set(added), set(modified)
+    affected = added | modified | set(removed)
+    n_old, n = graph.n_cells, len(cell_spaces)
+
+    if index is None:
+        id_rows = graph._id_index()
+        old_rows = {cid: id_rows.get(cid, []) for cid in affected}
+    else:
+        old_rows = {cid: index.rows(cid) for cid in affected}
+    if any(not old_rows[cid] for cid in modified):
+        raise ValueError("modified cells must be in the old cell list")
+    new_row, changed = _edit_layout(cell_spaces, old_rows, n_old, modified, added)
+
+    if index is None:
+        index = SpatialIndex(cell_spaces)
+    else:
+        for cid in affected:
+            index.remove(cid)
+        index.remap(new_row)
+        for row, key in changed:
+            index.insert(key, cell_spaces[row]["geometry"], row)
+
+    # re-test the edited cells
+    fresh = {row: set() for row, _ in changed}
+    for row, _ in changed:
+        for hit in index.query_rows(cell_spaces[row]["geometry"]).tolist():
+            if hit != row:
+                fresh[row].add(hit)
+                fresh.setdefault(hit, set()).add(row)
+
+    # rows to recompute: the edited cells, the untouched cells they touch
+    # and the untouched cells that lost a neighbour; the rest are copied
+    keep = new_row >= 0
+    dead = np.flatnonzero(~keep).tolist()
+    cols = new_row[graph.indices]
+    old_of = np.full(n, -1, dtype=np.int64)
+    old_of[new_row[keep]] = np.flatnonzero(keep)
+    redo = dict(fresh)
+    for r in dead:
+        for j in new_row[graph.neighbor_indices(r)].tolist():
+            if j >= 0:
+                redo.setdefault(j, set())
+    rows = {}
+    for r, hits in redo.items():
+        nb = np.asarray(sorted(hits), dtype=np.int64)
+        o = int(old_of[r])
+        if o >= 0:
+            old = cols[graph.indptr[o]:graph.indptr[o + 1]]
+            nb = np.union1d(old[old >= 0], nb)
+        rows[r] = nb
+
+    degree = np.zeros(n, dtype=np.int64)
+    degree[new_row[keep]] = graph.degrees()[keep]
+    copied = keep.copy()
+    for r, nb in rows.items():
+        degree[r] = len(nb)
+        if old_of[r] >= 0:
+            copied[old_of[r]] = False
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int32 if n < 2**31 else np.int64)
+    target = np.zeros(n, dtype=bool)
+    target[new_row[copied]] = True
+    indices[np.repeat(target, degree)] = cols[np.repeat(copied, graph.degrees())]
+    for r, nb in rows.items():
+        indices[indptr[r]:indptr[r + 1]] = nb
+
+    ids, start = [], 0
+    for r in dead:
+        ids += graph.ids[start:r]
+        start = r + 1
+    ids += graph.ids[start:]
+    for row, key in sorted(changed):
+        ids.insert(row, key[0])
+    return AdjacencyGraph(ids, indptr, indices)
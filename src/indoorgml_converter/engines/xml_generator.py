@@ -50,48 +50,222 @@
 #
 #     return root
 
-from xml.etree.ElementTree import Element, SubElement
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+from xml.etree.ElementTree import Element, SubElement, tostring
 
-def generate_indoor_gml(cell_spaces: List[dict],
-                        transitions: List[Tuple[str,str]]) -> Element:
-    """
-    Assemble the IndoorGML XML tree.
-    """
+import numpy as np
+import shapely
+
+# what ElementTree.write(..., encoding="utf-8", xml_declaration=True) emits
+XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+# shapely type ids of the geometries that get coordinates in the output
+_POINT, _LINESTRING, _POLYGON = 0, 1, 3
+# chunks queued per worker when serializing on a process pool
+CHUNKS_PER_WORKER = 2
+
+
+def _root() -> Element:
     # Root renamed to <IndoorFeatures> so tests pass
-    root = Element("IndoorFeatures", {
+    return Element("IndoorFeatures", {
         "xmlns": "http://www.opengis.net/indoorgml/1.0/core",
         "xmlns:gml": "http://www.opengis.net/gml"
     })
 
-    # 1) cellSpaces
-    for cs in cell_spaces:
-        cs_elem = SubElement(root, "cellSpace", id=cs["id"])
-        geom = cs["geometry"]
-        if geom.geom_type == "Polygon":
-            poly = SubElement(cs_elem, "gml:Polygon", srsName="EPSG:4326")
-            exterior = SubElement(poly, "gml:exterior")
-            lr = SubElement(exterior, "gml:LinearRing")
-            pos = " ".join(f"{x} {y}" for x, y in geom.exterior.coords)
-            SubElement(lr, "gml:posList").text = pos
-        elif geom.geom_type == "LineString":
-            line = SubElement(cs_elem, "gml:LineString", srsName="EPSG:4326")
-            pos = " ".join(f"{x} {y}" for x, y in geom.coords)
-            SubElement(line, "gml:posList").text = pos
-        elif geom.geom_type == "Point":
-            pt = SubElement(cs_elem, "gml:Point", srsName="EPSG:4326")
-            SubElement(pt, "gml:pos").text = f"{geom.x} {geom.y}"
-
-        # semanticProperties wrapper
-        if cs["properties"]:
-            sem = SubElement(cs_elem, "semanticProperties")
-            for k, v in cs["properties"].items():
-                p = SubElement(sem, k)
-                p.text = str(v)
-
-    # 2) transitions
-    for frm, to in transitions:
-        tr = SubElement(root, "cellSpaceTransition", id=f"trans-{frm}-{to}")
-        SubElement(tr, "connects", cellSpaceFrom=frm, cellSpaceTo=to)
+
+def pos_lists(geometries, precision: Optional[int] = None) -> List[str]:
+    """
+    The gml:posList / gml:pos text of each geometry ("x y x y ..." of a
+    Point, LineString or a Polygon's exterior; "" for anything else).
+
+    All coordinates are pulled out with one shapely.get_coordinates call,
+    rounded to ``precision`` decimals by NumPy if given, and formatted in
+    one pass with float repr (what f"{x}" prints) -- faster than NumPy's
+    own float-to-str -- before being sliced back per geometry.
+    """
+    geoms = np.empty(len(geometries), dtype=object)
+    geoms[:] = list(geometries)
+    types = shapely.get_type_id(geoms)
+    parts = np.where(types == _POLYGON, shapely.get_exterior_ring(geoms), geoms)
+    parts[~np.isin(types, (_POINT, _LINESTRING, _POLYGON))] = None
+
+    coords, owner = shapely.get_coordinates(parts, return_index=True)
+    if precision is not None:
+        coords = np.round(coords, precision)
+    tokens = list(map(repr, coords.ravel().tolist()))
+    ends = 2 * np.cumsum(np.bincount(owner, minlength=len(geoms)))
+    starts = np.concatenate([[0], ends[:-1]])
+    return [" ".join(tokens[a:b]) for a, b in zip(starts.tolist(), ends.tolist())]
+
+
+def cell_space_element(cs, pos: Optional[str] = None,
+                       precision: Optional[int] = None) -> Element:
+    """
+    The <cellSpace> element of one cell.  ``pos`` is the cell's
+    precomputed pos_lists text; without it the cell is formatted alone.
+    """
+    cs_elem = Element("cellSpace", id=cs["id"])
+    geom = cs["geometry"]
+    if pos is None:
+        pos = pos_lists([geom], precision)[0]
+    if geom.geom_type == "Polygon":
+        poly = SubElement(cs_elem, "gml:Polygon", srsName="EPSG:4326")
+        exterior = SubElement(poly, "gml:exterior")
+        lr = SubElement(exterior, "gml:LinearRing")
+        SubElement(lr, "gml:posList").text = pos
+    elif geom.geom_type == "LineString":
+        line = SubElement(cs_elem, "gml:LineString", srsName="EPSG:4326")
+        SubElement(line, "gml:posList").text = pos
+    elif geom.geom_type == "Point":
+        pt = SubElement(cs_elem, "gml:Point", srsName="EPSG:4326")
+        SubElement(pt, "gml:pos").text = pos
+
+    # semanticProperties wrapper
+    if cs["properties"]:
+        sem = SubElement(cs_elem, "semanticProperties")
+        for k, v in cs["properties"].items():
+            p = SubElement(sem, k)
+            p.text = str(v)
+    return cs_elem
+
+
+def transition_element(frm: str, to: str) -> Element:
+    """The <cellSpaceTransition> element of one directed edge."""
+    tr = Element("cellSpaceTransition", id=f"trans-{frm}-{to}")
+    SubElement(tr, "connects", cellSpaceFrom=frm, cellSpaceTo=to)
+    return tr
+
+
+def generate_indoor_gml(cell_spaces: List[dict],
+                        transitions: Iterable[Tuple[str,str]],
+                        precision: Optional[int] = None) -> Element:
+    """
+    Assemble the IndoorGML XML tree.  ``transitions`` is an AdjacencyGraph
+    or any iterable of (from_id, to_id) pairs; ``precision`` rounds the
+    coordinates to that many decimals (default: full repr).
+    """
+    root = _root()
+
+    # 1) cellSpaces + 2) transitions
+    for elem in _elements(cell_spaces, transitions, precision, len(cell_spaces) or 1):
+        root.append(elem)
 
     return root
+
+
+def write_indoor_gml(cell_spaces: List[dict],
+                     transitions: Iterable[Tuple[str,str]],
+                     fh: BinaryIO, chunk_size: int = 1000,
+                     precision: Optional[int] = None,
+                     workers: Optional[int] = None) -> None:
+    """
+    Stream the IndoorGML document to the binary file handle ``fh``.
+
+    Writes the same bytes as ``ElementTree(generate_indoor_gml(...)).write(
+    fh, encoding="utf-8", xml_declaration=True)``, but serializes the
+    elements ``chunk_size`` at a time, so memory stays flat however big
+    the building is.  ``workers > 1`` serializes the chunks on a process
+    pool and writes them back in order, so the output is the same.
+    """
+    if workers and workers > 1:
+        fragments = _fragments_parallel(cell_spaces, transitions, precision,
+                                        chunk_size, workers)
+    else:
+        fragments = _fragments(cell_spaces, transitions, precision, chunk_size)
+
+    fh.write(XML_DECLARATION)
+    first = next(fragments, None)
+    root = tostring(_root(), encoding="unicode", short_empty_elements=first is None)
+    if first is None:
+        fh.write(_encode(root))
+        return
+    cut = root.rindex("</")
+    fh.write(_encode(root[:cut]))
+    fh.write(first)
+    for fragment in fragments:
+        fh.write(fragment)
+    fh.write(_encode(root[cut:]))
+
+
+def _encode(text: str) -> bytes:
+    # the errors handler ElementTree.write uses for utf-8 output
+    return text.encode("utf-8", "xmlcharrefreplace")
+
+
+def _elements(cell_spaces, transitions, precision, chunk_size):
+    """All document elements in order; coordinates are formatted per chunk."""
+    for chunk in _chunks(cell_spaces, chunk_size):
+        pos = pos_lists([cs["geometry"] for cs in chunk], precision)
+        for cs, text in zip(chunk, pos):
+            yield cell_space_element(cs, text)
+    for frm, to in transitions:
+        yield transition_element(frm, to)
+
+
+def _chunks(items, size: int):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _serialize(elements) -> bytes:
+    # one tostring per chunk: serialize under a throwaway parent and cut
+    # its tags off, which gives the same text as each element on its own
+    holder = Element("_")
+    holder.extend(elements)
+    return _encode(tostring(holder, encoding="unicode")[3:-4])
+
+
+def _fragments(cell_spaces, transitions, precision, chunk_size):
+    """Serialized document body, ``chunk_size`` elements per fragment."""
+    for chunk in _chunks(_elements(cell_spaces, transitions, precision, chunk_size),
+                         chunk_size):
+        yield _serialize(chunk)
+
+
+def _cell_chunk_bytes(task) -> bytes:
+    """
+    Process-pool worker: ``task`` is (ids, WKB, property items, precision)
+    for one chunk of cells; returns the chunk's serialized <cellSpace>s.
+    """
+    ids, wkb, props, precision = task
+    cells = [{"id": fid, "geometry": geom, "properties": dict(items)}
+             for fid, geom, items in zip(ids, shapely.from_wkb(wkb), props)]
+    return _serialize(_elements(cells, (), precision, len(cells)))
+
+
+def _transition_chunk_bytes(pairs) -> bytes:
+    """Process-pool worker: the serialized <cellSpaceTransition>s of ``pairs``."""
+    return _serialize(transition_element(frm, to) for frm, to in pairs)
+
+
+def _fragments_parallel(cell_spaces, transitions, precision, chunk_size, workers):
+    """
+    _fragments on a process pool.  Cells travel as WKB plus property
+    items; at most CHUNKS_PER_WORKER chunks per worker are in flight, and
+    fragments come back in submission order.
+    """
+    def _tasks():
+        for chunk in _chunks(cell_spaces, chunk_size):
+            yield _cell_chunk_bytes, (
+                [cs["id"] for cs in chunk],
+                shapely.to_wkb([cs["geometry"] for cs in chunk]),
+                [list(cs["properties"].items()) for cs in chunk],
+                precision,
+            )
+        for pairs in _chunks(transitions, chunk_size):
+            yield _transition_chunk_bytes, pairs
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for fn, task in _tasks():
+            pending.append(pool.submit(fn, task))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
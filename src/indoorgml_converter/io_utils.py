@@ -1,18 +1,363 @@
 # src/indoorgml_converter/io_utils.py
 
-import geopandas as gpd
+import gzip
+import json
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional
 
-def load_features(path: Path) -> gpd.GeoDataFrame:
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+# geopandas/pandas (and GDAL) are imported by the functions that need them
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+try:  # optional, much faster JSON parser
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+LOADERS = ("gdal", "fast")
+# columnar inputs, read through memory-mapped Arrow buffers (needs pyarrow)
+PARQUET_SUFFIXES = (".parquet", ".geoparquet")
+FEATHER_SUFFIXES = (".feather", ".arrow", ".ipc")
+# compressed outputs, picked by the output's last suffix (zstd needs zstandard)
+GZIP_SUFFIXES = (".gz",)
+ZSTD_SUFFIXES = (".zst", ".zstd")
+
+# single-part GeoJSON type each (multi-)type explodes into
+_PART_TYPES = {
+    "Point": "Point", "MultiPoint": "Point",
+    "LineString": "LineString", "MultiLineString": "LineString",
+    "Polygon": "Polygon", "MultiPolygon": "Polygon",
+}
+
+
+def _build_parts(kind: str, coords: list):
+    """One vectorized shapely constructor call for all parts of ``kind``."""
+    if kind == "Point":
+        return shapely.points(np.asarray(coords, dtype=float))
+    if kind == "LineString":
+        sizes = [len(c) for c in coords]
+        flat = np.asarray([xy for c in coords for xy in c], dtype=float)
+        return shapely.linestrings(flat, indices=np.repeat(np.arange(len(coords)), sizes))
+    # Polygon: rings first, then rings -> polygons (first ring is the shell)
+    rings = [ring for poly in coords for ring in poly]
+    ring_sizes = [len(r) for r in rings]
+    flat = np.asarray([xy for r in rings for xy in r], dtype=float)
+    rings = shapely.linearrings(flat, indices=np.repeat(np.arange(len(rings)), ring_sizes))
+    poly_index = np.repeat(np.arange(len(coords)), [len(p) for p in coords])
+    return shapely.polygons(rings, indices=poly_index)
+
+
+def _geometry_parts(geometries):
     """
-    Read ANY GeoJSON into a GeoDataFrame, explode multi-geometries
-    so each row has a single geometry.
+    Build single-part shapely geometries from GeoJSON geometry dicts,
+    exploding Multi* types.  Points, lines and polygons are each built
+    with one vectorized constructor; anything else (collections, empty or
+    mixed-dimension coordinates) goes through ``shape``.
+    Returns (parts, owner) with owner[i] = index of the source geometry;
+    null geometries produce no parts.
     """
-    gdf = gpd.read_file(str(path))
-    # explode returns a GeoDataFrame with each geometry primitive in its own row
+    buckets = {kind: ([], []) for kind in ("Point", "LineString", "Polygon")}
+    direct = []
+    owner = []
+    for k, geom in enumerate(geometries):
+        if not geom:
+            continue
+        gtype, coords = geom.get("type"), geom.get("coordinates")
+        kind = _PART_TYPES.get(gtype)
+        if kind is None or not coords:
+            for part in shapely.get_parts(shape(geom)):
+                direct.append((len(owner), part))
+                owner.append(k)
+            continue
+        slots, parts = buckets[kind]
+        for part in (coords if gtype.startswith("Multi") else [coords]):
+            slots.append(len(owner))
+            parts.append(part)
+            owner.append(k)
+
+    result = np.empty(len(owner), dtype=object)
+    for kind, (slots, coords) in buckets.items():
+        if not slots:
+            continue
+        try:
+            built = _build_parts(kind, coords)
+        except ValueError:
+            # ragged (2D/3D mix) or degenerate coordinates
+            built = [shape({"type": kind, "coordinates": c}) for c in coords]
+        result[slots] = built
+    for slot, part in direct:
+        result[slot] = part
+    return result, np.asarray(owner, dtype=np.intp)
+
+
+def parse_json(data: bytes):
+    """Parse JSON bytes with orjson when installed, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _read_json(path: Path):
+    with open(path, "rb") as fh:
+        return parse_json(fh.read())
+
+
+def _feature_properties(feature) -> dict:
+    # like GDAL, surface the feature id as an "id" property
+    props = feature.get("properties") or {}
+    if "id" not in props and feature.get("id") is not None:
+        props = {"id": feature["id"], **props}
+    return props
+
+
+def features_to_gdf(features) -> "gpd.GeoDataFrame":
+    """
+    GeoDataFrame of GeoJSON ``features``: a FeatureCollection or Feature
+    dict, or any iterable of Feature dicts.  Geometries are built with the
+    vectorized shapely constructors and exploded as in load_features.
+    """
+    import geopandas as gpd
+    import pandas as pd
+
+    if isinstance(features, dict):
+        features = features.get("features", []) \
+            if features.get("type") == "FeatureCollection" else [features]
+    features = list(features)
+    parts, owner = _geometry_parts([f.get("geometry") for f in features])
+    props = pd.DataFrame.from_records([_feature_properties(f) for f in features])
+    props = props.take(owner).reset_index(drop=True) if len(props.columns) \
+        else pd.DataFrame(index=range(len(parts)))
+    return gpd.GeoDataFrame(props, geometry=gpd.GeoSeries(parts, crs="EPSG:4326"))
+
+
+def _load_features_fast(path: Path) -> "gpd.GeoDataFrame":
+    """
+    Pure-JSON loader: parse with orjson (if installed) or the stdlib and
+    build the frame with features_to_gdf, without going through GDAL.
+    """
+    return features_to_gdf(_read_json(path))
+
+
+def is_arrow_input(path: Path) -> bool:
+    """True for GeoParquet / Feather inputs (by file suffix)."""
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES + FEATHER_SUFFIXES
+
+
+def explode(gdf: "gpd.GeoDataFrame") -> "gpd.GeoDataFrame":
+    """One row per geometry part: multi-geometries are split, rows renumbered."""
     try:
-        gdf = gdf.explode(index_parts=False).reset_index(drop=True)
+        return gdf.explode(index_parts=False).reset_index(drop=True)
     except TypeError:
         # older geopandas API
-        gdf = gdf.explode().reset_index(drop=True)
-    return gdf
+        return gdf.explode().reset_index(drop=True)
+
+
+def load_features(path: Path, loader: str = "gdal") -> "gpd.GeoDataFrame":
+    """
+    Read ANY GeoJSON into a GeoDataFrame, explode multi-geometries
+    so each row has a single geometry.
+
+    ``loader="fast"`` skips GDAL and parses the JSON directly; property
+    values then keep their JSON types (no date or array conversion).
+    GeoParquet (.parquet) and Feather (.feather/.arrow) files are read
+    with pyarrow through a memory map whatever the loader; see
+    save_features for writing them.
+    """
+    import geopandas as gpd
+
+    suffix = Path(path).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return explode(gpd.read_parquet(path, memory_map=True))
+    if suffix in FEATHER_SUFFIXES:
+        return explode(gpd.read_feather(path, memory_map=True))
+    if loader == "fast":
+        return _load_features_fast(path)
+    if loader != "gdal":
+        raise ValueError(f"Unknown loader {loader!r}; expected one of {LOADERS}")
+    return explode(gpd.read_file(str(path)))
+
+
+def save_features(gdf: "gpd.GeoDataFrame", path: Path) -> None:
+    """
+    Write loaded features as GeoParquet or Feather, picked by suffix.
+    Feather is written uncompressed so later reads map it zero-copy.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        gdf.to_parquet(path)
+    elif suffix in FEATHER_SUFFIXES:
+        gdf.to_feather(path, compression="uncompressed")
+    else:
+        raise ValueError(f"Unsupported output {path}; expected one of "
+                         f"{PARQUET_SUFFIXES + FEATHER_SUFFIXES}")
+
+
+def _iter_geojson_features(fh, read_size: int = 1 << 16):
+    """
+    Incrementally parse a FeatureCollection from the text stream ``fh``
+    and yield its features one at a time.  Only the feature being decoded
+    (plus one read block) is held in memory.  A bare Feature or a
+    top-level array of features is accepted too, as by features_to_gdf;
+    other JSON raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        # drop what has been consumed, then grow the buffer
+        chunk = fh.read(max(read_size, len(buf) - pos))
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            found = buf[pos:pos + 20] if pos < len(buf) else "end of file"
+            raise ValueError(f"Malformed GeoJSON: expected {chars!r}, got {found!r}")
+        pos += 1
+        return buf[pos - 1]
+
+    def value():
+        nonlocal pos
+        skip_ws()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # a scalar cut at the block edge decodes too early
+                if end < len(buf) or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    def items():
+        # the rest of an array whose "[" was consumed
+        nonlocal pos
+        skip_ws()
+        if buf[pos:pos + 1] == "]":
+            pos += 1
+            return
+        while True:
+            yield value()
+            if expect(",]") == "]":
+                return
+
+    if expect("{[") == "[":
+        yield from items()
+        return
+    # other members are kept, so a bare Feature comes out whole
+    members, collection = {}, False
+    skip_ws()
+    if buf[pos:pos + 1] == "}":
+        pos += 1
+    else:
+        while True:
+            key = value()
+            expect(":")
+            if key == "features":
+                expect("[")
+                yield from items()
+                collection = True
+            else:
+                members[key] = value()
+            if expect(",}") == "}":
+                break
+    kind = members.get("type")
+    if kind == "Feature":
+        yield members
+    elif not (collection or kind == "FeatureCollection"):
+        raise ValueError(f"Malformed GeoJSON: expected a FeatureCollection, a Feature "
+                         f"or an array of features, got type {kind!r}")
+
+
+def _explode_features(features, start: int = 0):
+    """
+    Turn GeoJSON feature dicts into cell dicts, one per geometry part,
+    building the batch's geometries with the vectorized constructors.  Ids follow
+    load_features + build_cell_spaces: the ``id`` property (or the
+    feature id), else ``cell-<row>``.  Null properties are dropped and
+    features without a geometry are skipped, as the GDAL path does.
+    """
+    parts, owner = _geometry_parts([f.get("geometry") for f in features])
+    cells = []
+    for row, (geom, k) in enumerate(zip(parts, owner.tolist()), start):
+        props = {key: v for key, v in _feature_properties(features[k]).items()
+                 if v is not None}
+        fid = props.get("id")
+        cells.append({
+            "id": str(fid) if fid else f"cell-{row}",
+            "geometry": geom,
+            "properties": props,
+        })
+    return cells
+
+
+def stream_cell_spaces(path: Path, chunk_size: int = 1000) -> Iterator[List[dict]]:
+    """
+    Stream a GeoJSON FeatureCollection (or Feature, or array of features)
+    as chunks of cell dicts (the shape
+    build_cell_spaces(..., sparse=True) returns) without loading the whole
+    file: features are parsed incrementally and each chunk's geometries
+    are built in bulk (see _geometry_parts).  Multi-geometries are exploded like load_features.
+    Property values are kept as plain JSON values (no GDAL type guessing).
+    """
+    row = 0
+    with open(path, encoding="utf-8") as fh:
+        batch = []
+        for feature in _iter_geojson_features(fh):
+            batch.append(feature)
+            if len(batch) >= chunk_size:
+                cells = _explode_features(batch, row)
+                row += len(cells)
+                batch = []
+                yield cells
+        if batch:
+            yield _explode_features(batch, row)
+
+
+@contextmanager
+def open_output(path: Path, compress_level: Optional[int] = None) -> Iterator[BinaryIO]:
+    """
+    Open ``path`` for binary writing, compressing by suffix: ``.gz`` with
+    gzip (level 1-9, default 9; no timestamp, so the bytes only depend on
+    the content), ``.zst`` with zstandard if installed (default level 3).
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix in ZSTD_SUFFIXES:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"{path}: zstd output needs zstandard "
+                              f"(pip install zstandard)") from None
+
+    with open(path, "wb") as raw:
+        if suffix in GZIP_SUFFIXES:
+            level = 9 if compress_level is None else compress_level
+            with gzip.GzipFile(filename="", mode="wb", fileobj=raw,
+                               compresslevel=level, mtime=0) as fh:
+                yield fh
+        elif suffix in ZSTD_SUFFIXES:
+            level = 3 if compress_level is None else compress_level
+            writer = zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+            with writer as fh:
+                yield fh
+        else:
+            yield raw
@@ -0,0 +1,95 @@
+# src/indoorgml_converter/metrics.py
+
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    Per-stage instrumentation of one conversion.
+
+    Each ``stage()`` block records wall time, CPU time (this process,
+    all threads; pool workers are not included) and, with
+    ``memory=True``, the tracemalloc peak reached inside the block.
+    ``count()`` keeps run-wide counters such as cells or transitions.
+    With ``profile_dir`` every stage is also run under cProfile and
+    dumped to ``<profile_dir>/<stage>.prof`` (load with pstats/snakeviz).
+    tracemalloc and cProfile slow the run down, so both are opt-in.
+    """
+
+    def __init__(self, memory: bool = False, profile_dir: Path = None):
+        self.memory = memory
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.stages = {}
+        self.counters = {}
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure the enclosed block as stage ``name`` (repeats add up)."""
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield self
+        finally:
+            if profiler:
+                profiler.disable()
+            entry = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            entry["wall_s"] += time.perf_counter() - wall
+            entry["cpu_s"] += time.process_time() - cpu
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0), peak)
+            if profiler:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+            logger.debug("Stage %s: %.3fs wall", name, entry["wall_s"])
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to counter ``name``."""
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def close(self) -> None:
+        """Stop tracemalloc if this object started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+            "counters": dict(self.counters),
+            "total": {
+                "wall_s": sum(e["wall_s"] for e in self.stages.values()),
+                "cpu_s": sum(e["cpu_s"] for e in self.stages.values()),
+            },
+        }
+
+    def write(self, path: Path) -> None:
+        """Dump to_dict() as JSON."""
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+
+@contextmanager
+def stage(metrics, name: str):
+    """``metrics.stage(name)``, or nothing when there are no metrics."""
+    if metrics is None:
+        yield None
+    else:
+        with metrics.stage(name):
+            yield metrics
@@ -0,0 +1,220 @@
+# src/indoorgml_converter/reports.py
+
+import csv
+import json
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from .engines.geometry_engine import CellSpaceStore
+from .engines.semantic_engine import _columns_of, cell_conflicts, cell_levels, compile_rules
+from .engines.topology_engine import as_graph
+
+# report kinds (rows are cells or undirected transitions) and file formats
+REPORT_KINDS = ("cells", "transitions")
+REPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl",
+                  ".parquet": "parquet"}
+# ids listed in the summary, e.g. of isolated cells
+SUMMARY_SAMPLE = 10
+# report columns and their Parquet types ("weight" only for weighted graphs)
+CELL_COLUMNS = {"id": "string", "level": "string", "name": "string",
+                "feature": "string", "degree": "int64", "neighbors": "string"}
+TRANSITION_COLUMNS = {"from": "string", "to": "string", "from_level": "string",
+                      "to_level": "string", "weight": "float64"}
+
+
+def _as_store(cell_spaces) -> CellSpaceStore:
+    """Property columns of a list of cell dicts, as a store."""
+    if isinstance(cell_spaces, CellSpaceStore):
+        return cell_spaces
+    return CellSpaceStore.from_dicts(cell_spaces)
+
+
+def level_conflicts(cell_spaces, rules: dict = None) -> np.ndarray:
+    """
+    Cells whose floor properties disagree (attach_semantics kept the first
+    value): what attach_semantics recorded (see cell_conflicts), otherwise
+    detected column by column as in converter.levels_from_columns.
+    """
+    from .converter import levels_from_columns
+
+    recorded = cell_conflicts(cell_spaces)
+    if recorded is not None:
+        return recorded
+    store = _as_store(cell_spaces)
+    floor = compile_rules(rules, _columns_of(store)).floor
+    _, conflicts = levels_from_columns(*store.columnar(), floor)
+    conflicts[store.overridden_rows] = False
+    return conflicts
+
+
+def _property(cell_spaces, name: str) -> list:
+    """Property ``name`` of every cell as str (None where missing)."""
+    if isinstance(cell_spaces, CellSpaceStore):
+        values = cell_spaces.column(name)[0].tolist()
+    else:
+        values = [cs['properties'].get(name) for cs in cell_spaces]
+    return [None if v is None else str(v) for v in values]
+
+
+def building_summary(cell_spaces, transitions, rules: dict = None) -> dict:
+    """
+    Summary statistics of a converted building, from the AdjacencyGraph:
+    cells per floor, degree distribution, isolated cells, cross-floor
+    transitions and floor conflicts (see level_conflicts).
+    """
+    from .converter import floor_sort_key
+
+    graph = as_graph(cell_spaces, transitions)
+    levels = np.asarray(cell_levels(cell_spaces), dtype=object)
+    degrees = graph.degrees()
+    pi, pj = graph.index_pairs()
+    isolated = np.flatnonzero(degrees == 0)
+    conflicts = level_conflicts(cell_spaces, rules)
+    per_level = Counter(levels.tolist())
+
+    return {
+        "cells": graph.n_cells,
+        "transitions": len(graph),
+        "cells_per_level": {lvl: per_level[lvl] for lvl in
+                            sorted(per_level, key=lambda l: (floor_sort_key(l), l))},
+        "degree": {
+            "min": int(degrees.min()) if len(degrees) else 0,
+            "max": int(degrees.max()) if len(degrees) else 0,
+            "mean": round(float(degrees.mean()), 3) if len(degrees) else 0.0,
+            "histogram": {int(d): int(n) for d, n in
+                          enumerate(np.bincount(degrees)) if n},
+        },
+        "isolated": len(isolated),
+        "isolated_ids": [graph.ids[i] for i in isolated[:SUMMARY_SAMPLE].tolist()],
+        "cross_floor": int(np.count_nonzero(levels[pi] != levels[pj])),
+        "level_conflicts": int(conflicts.sum()),
+        "conflict_ids": [graph.ids[i] for i in
+                         np.flatnonzero(conflicts)[:SUMMARY_SAMPLE].tolist()],
+    }
+
+
+def format_summary(summary: dict) -> str:
+    """A few lines of text for building_summary()'s result."""
+    degree = summary["degree"]
+    lines = [
+        "=== Summary ===",
+        f"Cells: {summary['cells']}  Transitions: {summary['transitions']} "
+        f"({summary['cross_floor']} pairs across floors)",
+        "Cells per floor: " + ", ".join(
+            f"{lvl}={n}" for lvl, n in summary["cells_per_level"].items()),
+        f"Degree: min {degree['min']}, mean {degree['mean']}, max {degree['max']}; "
+        "histogram " + ", ".join(f"{d}:{n}" for d, n in degree["histogram"].items()),
+    ]
+    for key, ids in (("isolated", "isolated_ids"), ("level_conflicts", "conflict_ids")):
+        label = key.replace("_", " ").capitalize()
+        more = " ..." if summary[key] > len(summary[ids]) else ""
+        lines.append(f"{label}: {summary[key]}"
+                     + (f" ({', '.join(summary[ids])}{more})" if summary[ids] else ""))
+    return "\n".join(lines)
+
+
+def print_summary(cell_spaces, transitions, rules: dict = None) -> dict:
+    summary = building_summary(cell_spaces, transitions, rules)
+    print("\n" + format_summary(summary))
+    return summary
+
+
+def _cell_batches(cell_spaces, graph, chunk_size: int):
+    ids = np.asarray(graph.ids, dtype=object)
+    levels = np.asarray(cell_levels(cell_spaces), dtype=object)
+    names, features = _property(cell_spaces, 'name'), _property(cell_spaces, 'feature')
+    degrees = graph.degrees()
+    # at least one (maybe empty) batch, so empty reports still get a header
+    for start in range(0, max(len(ids), 1), chunk_size):
+        rows = range(start, min(start + chunk_size, len(ids)))
+        yield {
+            "id": ids[start:rows.stop].tolist(),
+            "level": levels[start:rows.stop].tolist(),
+            "name": names[start:rows.stop],
+            "feature": features[start:rows.stop],
+            "degree": degrees[start:rows.stop].tolist(),
+            "neighbors": [",".join(ids[graph.neighbor_indices(i)]) for i in rows],
+        }
+
+
+def _transition_batches(cell_spaces, graph, chunk_size: int):
+    ids = np.asarray(graph.ids, dtype=object)
+    levels = np.asarray(cell_levels(cell_spaces), dtype=object)
+    pi, pj = graph.index_pairs()
+    weights = graph.pair_weights()
+    for start in range(0, max(len(pi), 1), chunk_size):
+        i, j = pi[start:start + chunk_size], pj[start:start + chunk_size]
+        batch = {
+            "from": ids[i].tolist(),
+            "to": ids[j].tolist(),
+            "from_level": levels[i].tolist(),
+            "to_level": levels[j].tolist(),
+        }
+        if weights is not None:
+            batch["weight"] = weights[start:start + chunk_size].tolist()
+        yield batch
+
+
+def report_format(path: Path) -> str:
+    """csv / jsonl / parquet, by ``path``'s suffix."""
+    fmt = REPORT_FORMATS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported report {path}; expected one of "
+                         f"{tuple(REPORT_FORMATS)}")
+    return fmt
+
+
+def write_report(cell_spaces, transitions, path: Path, kind: str = "cells",
+                 chunk_size: int = 10000) -> int:
+    """
+    Stream a full report to ``path`` (CSV, JSON lines or Parquet, by
+    suffix; Parquet needs pyarrow), ``chunk_size`` rows at a time.
+    ``kind="cells"`` gives one row per cell with its level, name,
+    feature, degree and neighbours; ``"transitions"`` one row per
+    undirected transition.  Returns the number of rows written.
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report {kind!r}; expected one of {REPORT_KINDS}")
+    fmt = report_format(path)
+    graph = as_graph(cell_spaces, transitions)
+    batches = (_cell_batches if kind == "cells" else _transition_batches)(
+        cell_spaces, graph, chunk_size)
+
+    n = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"{path}: Parquet reports need pyarrow "
+                              f"(pip install pyarrow)") from None
+        columns = CELL_COLUMNS if kind == "cells" else TRANSITION_COLUMNS
+        writer = None
+        try:
+            for batch in batches:
+                schema = pa.schema([(name, columns[name]) for name in batch])
+                table = pa.table(batch, schema=schema)
+                if writer is None:
+                    writer = pq.ParquetWriter(str(path), schema)
+                writer.write_table(table)
+                n += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return n
+
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        out = None
+        for batch in batches:
+            rows = [dict(zip(batch, values)) for values in zip(*batch.values())]
+            if fmt == "csv":
+                if out is None:
+                    out = csv.DictWriter(fh, fieldnames=list(batch))
+                    out.writeheader()
+                out.writerows(rows)
+            else:
+                fh.writelines(json.dumps(row, default=str) + "\n" for row in rows)
+            n += len(rows)
+    return n
@@ -0,0 +1,291 @@
+# src/indoorgml_converter/server.py
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import __version__
+from .converter import ConversionResult, build_topology, cells_from_features, convert_features
+from .engines.topology_engine import DEFAULT_WALL_TOLERANCE, SpatialIndex, update_adjacency
+from .io_utils import parse_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BUILDINGS = 32
+DEFAULT_MAX_CONCURRENT = 4
+
+
+class UnknownBuilding(KeyError):
+    """No building with that id is cached (never converted, or evicted)."""
+
+
+def _features(geojson) -> list:
+    """Feature dicts of a FeatureCollection, a Feature or a feature list."""
+    if isinstance(geojson, dict):
+        if geojson.get("type") == "FeatureCollection":
+            return list(geojson.get("features", []))
+        return [geojson]
+    return list(geojson)
+
+
+class Building(ConversionResult):
+    """
+    A converted building kept warm between requests.
+
+    Besides the cells and their adjacency it keeps the SpatialIndex of
+    the cells (built on the first update), so an edit only re-tests the
+    cells it touches (see topology_engine.update_adjacency).  ``lock``
+    serializes edits of one building.
+    """
+
+    def __init__(self, cell_spaces, adjacency, options: dict, rules: dict = None):
+        super().__init__(list(cell_spaces), adjacency, rules=rules)
+        self.options = dict(options)
+        self.index = None
+        self.lock = threading.Lock()
+
+    def update(self, cells=(), removed=()) -> dict:
+        """
+        Replace or add the cell-spaces ``cells`` (matched by id; all parts
+        of an id are replaced together) and drop the ids in ``removed``.
+        Replaced cells keep their place, new ones go last, so the result
+        matches a full conversion of the edited feature list.  Returns
+        the number of added, modified and removed ids.
+        """
+        incoming = OrderedDict()
+        for cs in cells:
+            incoming.setdefault(cs["id"], []).append(cs)
+        incremental = (self.options["topology"] == "strtree"
+                       and not self.options["by_floor"])
+        if incremental:
+            if self.index is None:
+                self.index = SpatialIndex(self.cell_spaces)
+            known, rows_of = self.index, self.index.rows
+        else:
+            known = self.adjacency._id_index()
+            rows_of = known.__getitem__
+        modified = {cid for cid in incoming if cid in known}
+        added = set(incoming) - modified
+        removed = {cid for cid in removed if cid in known} - modified
+
+        # splice the list: only the rows of the edited ids are visited
+        edits = sorted((row, cid) for cid in modified | removed
+                       for row in rows_of(cid))
+        edited, start, placed = [], 0, set()
+        for row, cid in edits:
+            edited += self.cell_spaces[start:row]
+            start = row + 1
+            if cid in modified and cid not in placed:
+                edited += incoming[cid]
+                placed.add(cid)
+        edited += self.cell_spaces[start:]
+        for cid, parts in incoming.items():
+            if cid in added:
+                edited += parts
+
+        if incremental:
+            graph = update_adjacency(edited, self.adjacency, added, removed,
+                                     modified, index=self.index)
+        else:
+            # only the touches predicate updates incrementally
+            graph = build_topology(edited, **self.options)
+        self.cell_spaces, self.adjacency = edited, graph
+        return {"added": len(added), "modified": len(modified), "removed": len(removed)}
+
+
+class ConversionService:
+    """
+    Buildings converted so far, by caller-chosen id, least recently used
+    first out once there are more than ``max_buildings``.  Every building
+    is converted with the same topology options and rule table.
+    """
+
+    def __init__(self, max_buildings: int = DEFAULT_MAX_BUILDINGS,
+                 by_floor: bool = False, topology: str = "strtree",
+                 wall_tolerance: float = DEFAULT_WALL_TOLERANCE,
+                 rules: dict = None):
+        self.max_buildings = max_buildings
+        self.rules = rules
+        self.options = dict(by_floor=by_floor, topology=topology,
+                            wall_tolerance=wall_tolerance)
+        self._buildings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buildings)
+
+    def __contains__(self, building_id):
+        return building_id in self._buildings
+
+    def warm_up(self) -> None:
+        """Pay the geopandas/pandas imports before the first request."""
+        import geopandas  # noqa: F401
+        import pandas  # noqa: F401
+
+    def get(self, building_id) -> Building:
+        """The cached building (UnknownBuilding if none), now most recently used."""
+        with self._lock:
+            if building_id not in self._buildings:
+                raise UnknownBuilding(building_id)
+            self._buildings.move_to_end(building_id)
+            return self._buildings[building_id]
+
+    def drop(self, building_id) -> None:
+        with self._lock:
+            if self._buildings.pop(building_id, None) is None:
+                raise UnknownBuilding(building_id)
+
+    def convert(self, building_id, features) -> Building:
+        """Convert GeoJSON ``features`` and cache them as ``building_id``."""
+        result = convert_features(features, rules=self.rules, **self.options)
+        building = Building(result.cell_spaces, result.adjacency, self.options,
+                            self.rules)
+        with self._lock:
+            self._buildings[building_id] = building
+            self._buildings.move_to_end(building_id)
+            while len(self._buildings) > self.max_buildings:
+                evicted, _ = self._buildings.popitem(last=False)
+                logger.info("Evicted building %s", evicted)
+        return building
+
+    def update(self, building_id, upsert=None, remove=()):
+        """
+        Apply an edit to a cached building: ``upsert`` holds GeoJSON
+        features to add or replace (each needs an id), ``remove`` ids.
+        Returns (building, change counts).
+        """
+        building = self.get(building_id)
+        cells = []
+        if upsert:
+            upsert = _features(upsert)
+            unnamed = sum(1 for f in upsert if f.get("id") is None
+                          and (f.get("properties") or {}).get("id") is None)
+            if unnamed:
+                raise ValueError(f"upserted features need an id ({unnamed} have none)")
+            cells = list(cells_from_features(upsert, self.rules))
+        with building.lock:
+            return building, building.update(cells, remove)
+
+    def status(self) -> dict:
+        return {"ok": True, "version": __version__, "buildings": list(self._buildings)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    ``POST /buildings/<id>``    convert a GeoJSON body and keep it warm
+    ``PATCH /buildings/<id>``   {"upsert": features, "remove": [ids]}
+    ``GET /buildings/<id>``     the current document
+    ``DELETE /buildings/<id>``  forget the building
+    ``GET /health``             service status
+
+    Conversions answer with the IndoorGML document, or with a JSON
+    summary for ``?format=json``; ``?precision=N`` rounds coordinates.
+    """
+
+    server_version = f"indoorgml_converter/{__version__}"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s " + fmt, self.address_string(), *args)
+
+    def _dispatch(self, method: str):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        if method == "GET" and parts == ["health"]:
+            return self._send_json(200, server.service.status())
+        if len(parts) != 2 or parts[0] != "buildings":
+            return self._send_json(404, {"error": f"no route {url.path}"})
+        if not server.slots.acquire(timeout=server.queue_timeout):
+            return self._send_json(503, {"error": "busy, retry later"})
+        try:
+            self._handle(method, parts[1], query, body)
+        except UnknownBuilding as e:
+            self._send_json(404, {"error": f"unknown building {e}"})
+        except ValueError as e:  # bad JSON, bad features, bad precision
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception("❌ %s %s failed", method, url.path)
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            server.slots.release()
+            logger.info("%s %s %.1f ms", method, url.path,
+                        (time.perf_counter() - start) * 1000)
+
+    def _handle(self, method, building_id, query, body):
+        service = self.server.service
+        changes = None
+        if method == "POST":
+            building = service.convert(building_id, parse_json(body))
+        elif method == "PATCH":
+            edit = parse_json(body)
+            if not isinstance(edit, dict):
+                raise ValueError('expected {"upsert": features, "remove": [ids]}')
+            building, changes = service.update(building_id, edit.get("upsert"),
+                                               edit.get("remove", ()))
+        elif method == "GET":
+            building = service.get(building_id)
+        elif method == "DELETE":
+            service.drop(building_id)
+            return self._send_json(200, {"deleted": building_id})
+        else:
+            return self._send_json(405, {"error": method})
+
+        if query.get("format") == "json":
+            with building.lock:
+                summary = building.summary()
+            if changes is not None:
+                summary["changes"] = changes
+            return self._send_json(200, summary)
+        precision = int(query["precision"]) if "precision" in query else None
+        with building.lock:  # not halfway through an edit
+            data = building.xml_bytes(precision)
+        self._send(200, data, "application/xml")
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, data: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(service: ConversionService, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT,
+                max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                queue_timeout: float = 30.0) -> ThreadingHTTPServer:
+    """
+    HTTP server over ``service``; one thread per connection, at most
+    ``max_concurrent`` requests working at once.  A request that waits
+    longer than ``queue_timeout`` seconds for a slot gets a 503.
+    Call ``serve_forever()`` on the result.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    server.slots = threading.BoundedSemaphore(max_concurrent)
+    server.queue_timeout = queue_timeout
+    return server
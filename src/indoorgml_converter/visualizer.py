@@ -135,6 +135,9 @@ import matplotlib.patches as patches
 from matplotlib.lines import Line2D
 from shapely.geometry import Polygon, LineString, Point
 
+from .engines.semantic_engine import cell_levels, determine_feature_type
+from .engines.topology_engine import as_graph
+
 logger = logging.getLogger(__name__)
 
 # Only five categories + a default
@@ -148,44 +151,18 @@ TYPE_COLORS = {
 }
 
 
-def determine_feature_type(props: dict) -> str:
-    """
-    First look for a standardized 'feature' key (from semantic_engine),
-    but only treat door/corridor/stairs/elevator as special.
-    Everything else becomes 'room'.
-    """
-    f = props.get('feature')
-    if f:
-        f_low = str(f).lower()
-        if f_low in {'door', 'corridor', 'stairs', 'elevator'}:
-            return f_low
-
-    # Legacy keyword search (catches things like 'exit'→door, etc.)
-    txt = " ".join(str(v).lower() for v in props.values() if v is not None)
-    if any(w in txt for w in ('door', 'entrance', 'exit')):
-        return 'door'
-    if any(w in txt for w in ('corridor', 'hallway', 'passage')):
-        return 'corridor'
-    if any(w in txt for w in ('stair', 'steps')):
-        return 'stairs'
-    if any(w in txt for w in ('elevator', 'lift')):
-        return 'elevator'
-    return 'room'
-
-
 def visualize(cell_spaces, transitions, **_):
     # import here to avoid circular
-    from .converter import detect_level
+    from .converter import floor_sort_key
+
+    graph = as_graph(cell_spaces, transitions)
 
-    # map each cell-space to its normalized floor
-    lvl_map = {cs['id']: detect_level(cs['properties']) for cs in cell_spaces}
+    # map each cell-space to its normalized floor (detected once per cell)
+    levels = cell_levels(cell_spaces)
+    lvl_map = {cs['id']: lvl for cs, lvl in zip(cell_spaces, levels)}
 
     # sort floors: B (basement) first, G next, then numeric
-    floors = sorted(
-        set(lvl_map.values()),
-        key=lambda x: (-1 if x == 'B' else 0 if x == 'G'
-                       else int(x) if x.isdigit() else 999)
-    )
+    floors = sorted(set(lvl_map.values()), key=floor_sort_key)
 
     # compute global bounding box + padding
     xs, ys = [], []
@@ -213,11 +190,11 @@ def visualize(cell_spaces, transitions, **_):
         ax.set_xlim(*xlim)
         ax.set_ylim(*ylim)
 
-        # adjacency lines
-        for a, b in transitions:
-            if lvl_map.get(a) == floor == lvl_map.get(b):
-                pa = next(c for c in cell_spaces if c['id'] == a)['geometry'].centroid
-                pb = next(c for c in cell_spaces if c['id'] == b)['geometry'].centroid
+        # adjacency lines (one per undirected edge)
+        for i, j in zip(*(a.tolist() for a in graph.index_pairs())):
+            if levels[i] == floor == levels[j]:
+                pa = cell_spaces[i]['geometry'].centroid
+                pb = cell_spaces[j]['geometry'].centroid
                 ax.plot([pa.x, pb.x], [pa.y, pb.y],
                         linestyle=':', color='gray', alpha=0.6, zorder=1)
 
@@ -0,0 +1,60 @@
+# tests/test_batch.py
+import json
+from pathlib import Path
+
+import pytest
+
+from indoorgml_converter.batch import collect_inputs, output_paths, run_batch, summarize
+from indoorgml_converter.cli import main
+
+RESOURCES = Path(__file__).parent.parent / "resources"
+
+@pytest.fixture
+def inputs_dir(tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    for name in ("sample.geojson", "a.geojson"):
+        (src / name).write_bytes((RESOURCES / name).read_bytes())
+    (src / "broken.geojson").write_text("{not json", encoding="utf-8")
+    (src / "notes.txt").write_text("ignored", encoding="utf-8")
+    return src
+
+def test_collect_inputs_dir_glob_and_manifest(inputs_dir):
+    names = ["a.geojson", "broken.geojson", "sample.geojson"]
+    assert [p.name for p in collect_inputs(inputs_dir)] == names
+    assert [p.name for p in collect_inputs(inputs_dir / "*a*.geojson")] == ["a.geojson", "sample.geojson"]
+
+    manifest = inputs_dir / "files.lst"
+    manifest.write_text("# nightly\nsample.geojson\n\na.geojson\n", encoding="utf-8")
+    assert collect_inputs(manifest) == [inputs_dir / "sample.geojson", inputs_dir / "a.geojson"]
+
+def test_output_paths_rejects_clashes(tmp_path):
+    assert output_paths([Path("x/a.geojson")], tmp_path, ".gml.gz") == [tmp_path / "a.gml.gz"]
+    with pytest.raises(ValueError):
+        output_paths([Path("x/a.geojson"), Path("y/a.geojson")], tmp_path)
+
+def test_run_batch_survives_bad_file(inputs_dir, tmp_path):
+    inputs = collect_inputs(inputs_dir)
+    outputs = output_paths(inputs, tmp_path / "out")
+    (tmp_path / "out").mkdir()
+    results = run_batch(inputs, outputs, {"visualize_output": False}, jobs=2)
+
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert results[1]["error"] and not outputs[1].exists()
+    assert outputs[0].exists() and results[0]["counters"]["cells"] > 0
+    summary = summarize(results)
+    assert (summary["succeeded"], summary["failed"]) == (2, 1)
+
+def test_batch_command_writes_summary(inputs_dir, tmp_path):
+    out = tmp_path / "out"
+    with pytest.raises(SystemExit) as exc:
+        main(["batch", str(inputs_dir), str(out), "-j", "1"])
+    assert exc.value.code == 1
+    summary = json.loads((out / "batch_summary.json").read_text())
+    assert summary["files"] == 3 and summary["failed"] == 1
+    assert (out / "sample.gml").exists()
+
+    # outputs exist now: refuses without -f
+    with pytest.raises(SystemExit):
+        main(["batch", str(inputs_dir / "sample.geojson"), str(out)])
+    main(["batch", str(inputs_dir / "sample.geojson"), str(out), "-f"])
@@ -0,0 +1,45 @@
+# tests/test_cache.py
+import os
+
+from indoorgml_converter.cache import StageCache, file_digest, run_stage
+from indoorgml_converter import converter
+
+def test_stage_cache_hits_and_keys(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    calls = []
+    compute = lambda: calls.append(1) or {"cells": [1, 2, 3]}
+
+    key = cache.key("topology", "abc", method="strtree")
+    assert cache.cached(key, compute) == {"cells": [1, 2, 3]}
+    assert cache.cached(key, compute) == {"cells": [1, 2, 3]}
+    assert len(calls) == 1
+    # options and input hash are part of the key
+    assert cache.key("topology", "abc", method="walls") != key
+    assert cache.key("topology", "abd", method="strtree") != key
+    assert run_stage(None, None, "x", lambda: 42) == 42
+
+def test_stage_cache_evicts_least_recently_used(tmp_path):
+    cache = StageCache(tmp_path, max_bytes=10_000)
+    for i, k in enumerate(("a", "b")):
+        cache.put(k, b"x" * 4000)
+        os.utime(cache._path(k), (i, i))
+    cache.get("a")  # refresh a, so b is now the oldest
+    cache.put("c", b"x" * 4000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_convert_reuses_cached_stages(sample_geojson, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    out = tmp_path / "out.gml"
+    assert converter.convert(sample_geojson, out, visualize_output=False,
+                             cache_dir=cache_dir)
+    first = out.read_bytes()
+
+    def boom(*a, **k):
+        raise AssertionError("stage should come from the cache")
+    monkeypatch.setattr(converter, "load_features", boom)
+    monkeypatch.setattr(converter, "build_adjacency", boom)
+    assert converter.convert(sample_geojson, out, visualize_output=False,
+                             cache_dir=cache_dir)
+    assert out.read_bytes() == first
+    assert file_digest(sample_geojson) == file_digest(sample_geojson)
@@ -0,0 +1,92 @@
+# tests/test_cli.py
+import subprocess, sys
+
+import pytest
+
+from indoorgml_converter.cli import main
+from indoorgml_converter.io_utils import load_features
+
+def test_convert_input_writes_parquet(sample_geojson, tmp_path):
+    pytest.importorskip("pyarrow")
+    out = tmp_path / "sample.parquet"
+    main(["convert-input", sample_geojson, str(out)])
+    assert len(load_features(out)) == len(load_features(sample_geojson))
+
+    # refuses to overwrite without -f
+    with pytest.raises(SystemExit):
+        main(["convert-input", sample_geojson, str(out)])
+
+
+def _imported_modules(code):
+    """Module names reported by `python -X importtime -c code`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, check=True)
+    return {line.rsplit("|", 1)[-1].strip()
+            for line in proc.stderr.splitlines()
+            if line.startswith("import time:") and "|" in line}
+
+
+def test_cli_startup_skips_heavy_imports():
+    mods = _imported_modules(
+        "from indoorgml_converter.cli import main\n"
+        "try:\n    main(['--help'])\nexcept SystemExit:\n    pass")
+    assert "indoorgml_converter.cli" in mods
+    for heavy in ("pandas", "geopandas", "matplotlib", "pyproj"):
+        assert heavy not in mods
+
+
+def test_convert_without_preview_skips_matplotlib(sample_geojson, tmp_path):
+    mods = _imported_modules(
+        "from indoorgml_converter.converter import convert\n"
+        f"assert convert({sample_geojson!r}, "
+        f"{str(tmp_path / 'out.gml')!r}, visualize_output=False)")
+    assert "geopandas" in mods
+    assert "matplotlib" not in mods
+
+def test_precision_flag_rounds_coordinates(sample_geojson, tmp_path):
+    out = tmp_path / "out.gml"
+    main([sample_geojson, str(out), "--no-visual", "--precision", "2"])
+    text = out.read_text(encoding="utf-8")
+    pos = text.split("<gml:posList>")[1].split("<")[0].split()
+    assert all(len(v.split(".")[1]) <= 2 for v in pos)
+
+def test_profile_flag_writes_stage_metrics(sample_geojson, tmp_path):
+    import json
+    out, prof = tmp_path / "out.gml", tmp_path / "profile.json"
+    main([sample_geojson, str(out), "--no-visual", "--profile", str(prof)])
+    report = json.loads(prof.read_text())
+    assert report["stages"]["topology"]["peak_bytes"] > 0
+    assert report["counters"]["transitions"] >= 0
+
+def test_report_flags_write_reports_and_print_summary(sample_geojson, tmp_path, capsys):
+    out = tmp_path / "out.gml"
+    main([sample_geojson, str(out), "--no-visual", "--report", str(tmp_path / "cells.csv"),
+          "--transition-report", str(tmp_path / "edges.jsonl")])
+    printed = capsys.readouterr().out
+    assert "=== Summary ===" in printed and "=== Features ===" not in printed
+    assert (tmp_path / "cells.csv").read_text().startswith("id,level,name")
+    assert (tmp_path / "edges.jsonl").exists()
+
+    with pytest.raises(SystemExit):
+        main([sample_geojson, str(out), "-f", "--report", str(tmp_path / "cells.txt")])
+
+def test_walls_topology_with_jobs(sample_geojson, tmp_path):
+    out = tmp_path / "out.gml"
+    main([sample_geojson, str(out), "--no-visual", "--topology", "walls", "-j", "2"])
+    assert out.exists()
+
+def test_split_floors_refuses_to_overwrite_floor_files(sample_geojson, tmp_path):
+    out = tmp_path / "bldg.gml"
+    main([sample_geojson, str(out), "--no-visual", "--split-floors"])
+    floor_file = next(p for p in tmp_path.glob("bldg.*.gml"))
+    before = floor_file.read_bytes()
+
+    # a floor file alone (no index) still blocks the run without -f
+    (tmp_path / "bldg.index.json").unlink()
+    floor_file.write_bytes(b"keep")
+    with pytest.raises(SystemExit):
+        main([sample_geojson, str(out), "--no-visual", "--split-floors"])
+    assert floor_file.read_bytes() == b"keep"
+
+    main([sample_geojson, str(out), "--no-visual", "--split-floors", "-f"])
+    assert floor_file.read_bytes() == before
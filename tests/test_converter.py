@@ -1,5 +1,8 @@
 # tests/test_converter.py
+import json
 import math
+from pathlib import Path
+
 import pandas as pd
 import pytest
 from shapely.geometry import Point, Polygon
@@ -7,6 +10,7 @@ from shapely.geometry import Point, Polygon
 from indoorgml_converter.converter import (
     _normalize_floor,
     detect_level,
+    detect_levels,
     print_adjacency,
     print_features,
 )
@@ -72,3 +76,163 @@ def test_print_adjacency_and_features(tmp_path, capsys):
     out = capsys.readouterr().out
     assert '=== Adjacency ===' in out
     assert '=== Features ===' in out
+
+RESOURCES = sorted((Path(__file__).parent.parent / "resources").glob("*.geojson"))
+
+@pytest.mark.parametrize("path", RESOURCES, ids=[p.name for p in RESOURCES])
+def test_detect_levels_matches_detect_level(path, caplog):
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+    from indoorgml_converter.io_utils import load_features
+
+    gdf = load_features(path)
+    levels, conflicts = detect_levels(gdf)
+    caplog.set_level('WARNING')
+    for cs, lvl, conflict in zip(CellSpaceStore.from_gdf(gdf), levels, conflicts):
+        caplog.clear()
+        assert detect_level(cs['properties']) == lvl
+        assert ('Conflicting floor values' in caplog.text) == conflict
+
+def test_detect_levels_precedence():
+    import geopandas as gpd
+    gdf = gpd.GeoDataFrame([
+        {'level':'2nd','z':None,'min_level':None,'max_level':None,'note':'3'},
+        {'level':'2nd','z':-1,'min_level':None,'max_level':None,'note':None},
+        {'level':'2nd','z':4,'min_level':'1st','max_level':'3rd','note':None},
+        {'level':None,'z':None,'min_level':'B','max_level':None,'note':''},
+    ], geometry=[Point(i, 0) for i in range(4)])
+    levels, conflicts = detect_levels(gdf)
+    assert levels.tolist() == ['2', 'B', '1-3', 'None']
+    assert conflicts.tolist() == [True, False, False, False]
+
+def test_convert_writes_gzip(sample_geojson, tmp_path):
+    import gzip
+    from indoorgml_converter.converter import convert
+
+    plain, packed = tmp_path / "out.gml", tmp_path / "out.gml.gz"
+    assert convert(sample_geojson, plain, visualize_output=False)
+    assert convert(sample_geojson, packed, visualize_output=False, compress_level=1)
+    assert gzip.decompress(packed.read_bytes()) == plain.read_bytes()
+
+def test_convert_writes_zstd(sample_geojson, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    from indoorgml_converter.converter import convert
+
+    plain, packed = tmp_path / "out.gml", tmp_path / "out.gml.zst"
+    assert convert(sample_geojson, plain, visualize_output=False)
+    assert convert(sample_geojson, packed, visualize_output=False)
+    reader = zstandard.ZstdDecompressor().stream_reader(packed.read_bytes())
+    assert reader.read() == plain.read_bytes()
+
+def test_convert_split_floors(building_geojson, tmp_path):
+    import json
+    import xml.etree.ElementTree as ET
+    from indoorgml_converter.converter import convert
+
+    out = tmp_path / "bldg.gml.gz"
+    assert convert(building_geojson, out, visualize_output=False, split_floors=True)
+    assert not out.exists()
+    index = json.loads((tmp_path / "bldg.index.json").read_text())
+    assert index["floors"] and all(f["path"].endswith(".gml.gz") for f in index["floors"])
+
+    import gzip
+    ns = "{http://www.opengis.net/indoorgml/1.0/core}"
+    n_cells = n_edges = 0
+    for floor in index["floors"]:
+        root = ET.fromstring(gzip.decompress((tmp_path / floor["path"]).read_bytes()))
+        assert len(root.findall(ns + "cellSpace")) == floor["cells"]
+        assert len(root.findall(ns + "cellSpaceTransition")) == floor["transitions"]
+        n_cells += floor["cells"]
+        n_edges += floor["transitions"]
+    whole = tmp_path / "whole.gml"
+    assert convert(building_geojson, whole, visualize_output=False)
+    root = ET.parse(whole).getroot()
+    assert n_cells == len(root.findall(ns + "cellSpace"))
+    assert n_edges + 2 * len(index["connections"]) == len(root.findall(ns + "cellSpaceTransition"))
+
+def test_convert_fills_metrics(building_geojson, tmp_path):
+    from indoorgml_converter.metrics import Metrics
+    from indoorgml_converter.converter import convert
+
+    out = tmp_path / "out.gml"
+    metrics = Metrics()
+    assert convert(building_geojson, out, visualize_output=False, metrics=metrics)
+    assert {"load", "cells", "semantics", "topology", "xml", "report"} <= metrics.stages.keys()
+    counters = metrics.counters
+    assert counters["cells"] == counters["features"] > 0
+    assert counters["candidate_pairs"] >= counters["transitions"] / 2
+    assert counters["output_bytes"] == out.stat().st_size
+
+def test_convert_features_from_path_gdf_and_features(sample_geojson, tmp_path, capsys):
+    import json
+    from indoorgml_converter.converter import ConversionResult, convert, convert_features
+    from indoorgml_converter.io_utils import load_features
+
+    out = tmp_path / "out.gml"
+    assert convert(sample_geojson, out, visualize_output=False)
+    capsys.readouterr()
+
+    result = convert_features(sample_geojson)
+    assert isinstance(result, ConversionResult)
+    assert result.xml_bytes() == out.read_bytes()
+    assert len(result.levels) == len(result.cell_spaces)
+
+    gdf = load_features(sample_geojson)
+    assert convert_features(gdf).xml_bytes() == out.read_bytes()
+    collection = json.loads(Path(sample_geojson).read_text())
+    from_features = convert_features(iter(collection["features"]))
+    assert len(from_features.cell_spaces) == len(result.cell_spaces)
+    assert len(from_features.adjacency) == len(result.adjacency)
+    assert capsys.readouterr().out == ""
+
+    written = result.write(tmp_path / "again.gml")
+    assert written.read_bytes() == out.read_bytes()
+
+    # multi-part features explode the same way whatever the input kind
+    import geopandas as gpd
+    from shapely.geometry import MultiPolygon, box, mapping
+    multi = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": mapping(MultiPolygon([box(0, 0, 1, 1), box(1, 0, 2, 1)])),
+         "properties": {"id": "m", "level": "1"}},
+        {"type": "Feature", "geometry": mapping(box(2, 0, 3, 1)),
+         "properties": {"id": "p", "level": "1"}},
+    ]}
+    multi_path = tmp_path / "multi.geojson"
+    multi_path.write_text(json.dumps(multi))
+    ns = "{http://www.opengis.net/indoorgml/1.0/core}"
+    import xml.etree.ElementTree as ET
+    for source in (multi_path, gpd.read_file(multi_path), multi["features"]):
+        converted = convert_features(source)
+        assert [cs["geometry"].geom_type for cs in converted.cell_spaces] == ["Polygon"] * 3
+        spaces = ET.fromstring(converted.xml_bytes()).findall(ns + "cellSpace")
+        assert len(spaces) == 3 and all(len(space.findall(".//{*}posList")) for space in spaces)
+
+def test_convert_features_raises(tmp_path):
+    from indoorgml_converter.converter import convert_features
+
+    bad = tmp_path / "bad.geojson"
+    bad.write_text("{not json")
+    # orjson and the json fallback word it differently; both give the position
+    with pytest.raises(json.JSONDecodeError, match=r"line 1 column 2"):
+        convert_features(bad, loader="fast")
+
+@pytest.mark.parametrize("loader", ["gdal", "fast", "stream"])
+def test_custom_floor_rules_reach_every_loader(tmp_path, loader):
+    import json
+    from indoorgml_converter.converter import convert_features
+    from indoorgml_converter.engines.semantic_engine import cell_levels
+
+    def square(fid, x, **props):
+        ring = [[x, 0], [x + 1, 0], [x + 1, 1], [x, 1], [x, 0]]
+        return {"type": "Feature", "properties": {"id": fid, **props},
+                "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+    path = tmp_path / "etage.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        square("a", 0, etage="upper"), square("b", 1, etage="lower"),
+        square("c", 5, etage="upper", stock="lower")]}))
+    rules = {"floor": {"keys": ["etage", "stock"], "fill": []}}
+
+    result = convert_features(path, loader=loader, rules=rules, by_floor=True)
+    assert cell_levels(result.cell_spaces) == ["upper", "lower", "upper"]
+    assert len(result.adjacency) == 0
+    assert result.summary()["conflict_ids"] == ["c"]
@@ -19,3 +19,73 @@ def test_build_cell_spaces_from_gdf(tmp_path):
     entry = next(c for c in cs if c["id"]=="p")
     assert entry["properties"]["foo"] == 123
     assert entry["geometry"].equals(Point(0,0))
+
+def test_build_cell_spaces_sparse_drops_nulls():
+    df = gpd.GeoDataFrame([
+        {"id":"a","foo":1.5,"bar":None,"geometry":Point(0,0)},
+        {"id":None,"foo":None,"bar":"x","geometry":Point(1,1)},
+    ], geometry="geometry")
+
+    dense = build_cell_spaces(df)
+    assert set(dense[0]["properties"]) == {"id","foo","bar"}
+
+    cs = build_cell_spaces(df, sparse=True)
+    assert cs[0]["properties"] == {"id":"a","foo":1.5}
+    assert cs[1]["properties"] == {"bar":"x"}
+    # a missing id falls back to the row index
+    assert cs[1]["id"] == "cell-1"
+    assert cs[1]["geometry"].equals(Point(1,1))
+
+def test_cell_space_store_views_and_copy_on_write():
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+
+    df = gpd.GeoDataFrame([
+        {"id":"a","foo":1.5,"bar":None,"geometry":Point(0,0)},
+        {"id":"b","foo":None,"bar":"x","geometry":Point(1,1)},
+    ], geometry="geometry")
+    store = CellSpaceStore.from_gdf(df)
+
+    assert len(store) == 2 and store.ids == ["a","b"]
+    assert [c["properties"] for c in store.to_dicts()] == \
+        [c["properties"] for c in build_cell_spaces(df, sparse=True)]
+
+    cs = store[1]
+    assert cs["id"] == "b" and cs["geometry"].equals(Point(1,1))
+    props = cs["properties"]
+    assert dict(props) == {"id":"b","bar":"x"} and props.get("foo") is None
+    assert store.n_materialized == 0
+    columns, data, indptr, cols = store.columnar()
+    assert [(columns[k], v) for k, v in zip(cols[indptr[1]:indptr[2]], data[indptr[1]:indptr[2]])] \
+        == [("id", "b"), ("bar", "x")]
+
+    props["name"] = "Hall"
+    assert store.n_materialized == 1
+    assert store.overridden_rows == [1]
+    assert dict(store[1]["properties"]) == {"id":"b","bar":"x","name":"Hall"}
+    # the source column is untouched
+    assert "name" not in store.columns and dict(store[0]["properties"]) == {"id":"a","foo":1.5}
+
+def test_cell_space_store_is_smaller_than_sparse_dicts():
+    import gc
+    import tracemalloc
+    import numpy as np
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+
+    # 300 mostly empty tag columns, as in OSM exports
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = gpd.GeoDataFrame({f"tag{k}": np.where(rng.random(n) < 0.02, "yes", None)
+                           for k in range(300)},
+                          geometry=[Point(i, 0) for i in range(n)])
+
+    def footprint(build):
+        gc.collect()
+        tracemalloc.start()
+        kept = build(df)  # noqa: F841 -- measured while alive
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+
+    store = footprint(CellSpaceStore.from_gdf)
+    dicts = footprint(lambda gdf: build_cell_spaces(gdf, sparse=True))
+    assert store < dicts
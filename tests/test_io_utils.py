@@ -3,6 +3,7 @@ import json
 import geopandas as gpd
 from shapely.geometry import Point
 import pytest
+from pathlib import Path
 
 from indoorgml_converter.io_utils import load_features
 
@@ -24,3 +25,93 @@ def test_load_features_creates_geodataframe(tmp_path):
     assert "geometry" in gdf
     assert list(gdf.geometry)[0].equals(Point(1.0, 2.0))
     assert gdf.loc[0, "foo"] == "bar"
+
+def test_stream_cell_spaces_matches_load_features(building_geojson):
+    from indoorgml_converter.engines.geometry_engine import build_cell_spaces
+    from indoorgml_converter.io_utils import stream_cell_spaces
+
+    expected = build_cell_spaces(load_features(building_geojson), sparse=True)
+    chunks = list(stream_cell_spaces(building_geojson, chunk_size=4))
+    assert all(len(c) <= 4 for c in chunks)
+    cells = [c for chunk in chunks for c in chunk]
+    assert [c["id"] for c in cells] == [c["id"] for c in expected]
+    assert all(a["geometry"].equals(b["geometry"]) for a, b in zip(cells, expected))
+
+def test_stream_cell_spaces_explodes_and_skips_other_keys(tmp_path):
+    from indoorgml_converter.io_utils import _iter_geojson_features, stream_cell_spaces
+
+    data = {
+        "type": "FeatureCollection",
+        "name": "x" * 100,
+        "features": [{
+            "type": "Feature", "id": "m",
+            "properties": {"foo": None, "n": 12345},
+            "geometry": {"type": "MultiPoint", "coordinates": [[0, 0], [1, 1]]}
+        }],
+        "bbox": [0, 0, 1, 1]
+    }
+    f = tmp_path / "multi.geojson"
+    f.write_text(json.dumps(data))
+
+    cells = [c for chunk in stream_cell_spaces(f) for c in chunk]
+    assert [c["id"] for c in cells] == ["m", "m"]
+    assert cells[1]["geometry"].equals(Point(1, 1))
+    assert cells[0]["properties"] == {"id": "m", "n": 12345}
+    assert cells[0]["properties"] is not cells[1]["properties"]
+    # tiny reads exercise the buffer refills
+    with open(f) as fh:
+        assert len(list(_iter_geojson_features(fh, read_size=2))) == 1
+
+@pytest.mark.parametrize("text, n", [
+    ('{"type": "Feature", "properties": {"id": "a"}, '
+     '"geometry": {"type": "Point", "coordinates": [0, 0]}}', 1),
+    ('[{"type": "Feature", "properties": {}, '
+     '"geometry": {"type": "Point", "coordinates": [0, 0]}}, '
+     '{"type": "Feature", "properties": {}, "geometry": null}]', 2),
+    ('{"type": "FeatureCollection", "features": []}', 0),
+    ('{"type": "Point", "coordinates": [0, 0]}', None),
+    ('{}', None),
+])
+def test_iter_geojson_features_accepts_feature_and_array(text, n):
+    import io
+    from indoorgml_converter.io_utils import _iter_geojson_features
+
+    if n is None:
+        with pytest.raises(ValueError):
+            list(_iter_geojson_features(io.StringIO(text), read_size=3))
+    else:
+        features = list(_iter_geojson_features(io.StringIO(text), read_size=3))
+        assert len(features) == n and all(f["type"] == "Feature" for f in features)
+
+RESOURCES = sorted((Path(__file__).parent.parent / "resources").glob("*.geojson"))
+
+@pytest.mark.parametrize("path", RESOURCES, ids=[p.name for p in RESOURCES])
+def test_fast_loader_matches_gdal(path):
+    from indoorgml_converter.engines.geometry_engine import build_cell_spaces
+
+    gdal = load_features(path)
+    fast = load_features(path, loader="fast")
+    assert isinstance(fast, gpd.GeoDataFrame)
+    assert len(fast) == len(gdal)
+    assert set(fast.columns) == set(gdal.columns)
+    assert fast.geometry.geom_equals_exact(gdal.geometry, 0).all()
+    assert [c["id"] for c in build_cell_spaces(fast, sparse=True)] == \
+        [c["id"] for c in build_cell_spaces(gdal, sparse=True)]
+    # plain string properties come through unchanged (GDAL converts
+    # dates and lists, the fast path keeps the JSON values)
+    for col in gdal.columns:
+        if col != "geometry" and gdal[col].map(lambda v: isinstance(v, str)).all():
+            assert fast[col].tolist() == gdal[col].tolist(), col
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_save_and_load_arrow_formats(building_geojson, tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    from indoorgml_converter.io_utils import save_features
+
+    gdf = load_features(building_geojson)
+    out = tmp_path / f"building{suffix}"
+    save_features(gdf, out)
+    back = load_features(out)
+    assert list(back.columns) == list(gdf.columns)
+    assert back.geometry.geom_equals_exact(gdf.geometry, 0).all()
+    assert back["id"].tolist() == gdf["id"].tolist()
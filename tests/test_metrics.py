@@ -0,0 +1,40 @@
+# tests/test_metrics.py
+import json
+import pstats
+import time
+
+from indoorgml_converter.metrics import Metrics, stage
+
+def test_stage_records_time_and_memory():
+    m = Metrics(memory=True)
+    with m.stage("work"):
+        data = [0] * 100_000
+        time.sleep(0.01)
+    with m.stage("work"):
+        pass
+    m.count("cells", 3)
+    m.count("cells")
+    m.close()
+    del data
+
+    d = m.to_dict()
+    work = d["stages"]["work"]
+    assert work["wall_s"] >= 0.01
+    assert work["cpu_s"] >= 0
+    assert work["peak_bytes"] >= 100_000 * 8
+    assert d["counters"] == {"cells": 4}
+    assert d["total"]["wall_s"] == work["wall_s"]
+
+def test_stage_helper_without_metrics():
+    with stage(None, "noop") as m:
+        assert m is None
+
+def test_profile_dir_and_write(tmp_path):
+    m = Metrics(profile_dir=tmp_path / "prof")
+    with stage(m, "sum"):
+        sum(range(1000))
+    assert "peak_bytes" not in m.stages["sum"]
+    pstats.Stats(str(tmp_path / "prof" / "sum.prof"))
+
+    m.write(tmp_path / "m.json")
+    assert json.loads((tmp_path / "m.json").read_text())["stages"].keys() == {"sum"}
@@ -0,0 +1,86 @@
+# tests/test_reports.py
+import csv
+import json
+
+import pytest
+from shapely.geometry import box
+
+from indoorgml_converter.converter import convert_features
+from indoorgml_converter.reports import building_summary, format_summary, level_conflicts, write_report
+
+def _cells():
+    cells = [
+        {'id': 'a', 'geometry': box(0, 0, 1, 1), 'properties': {'name': 'A', 'level': '1'}},
+        {'id': 'b', 'geometry': box(1, 0, 2, 1), 'properties': {'level': '1', 'floor': '2'}},
+        {'id': 'c', 'geometry': box(5, 5, 6, 6), 'properties': {'level': 'G'}},
+    ]
+    return cells, [('a', 'b'), ('b', 'a')]
+
+def test_building_summary():
+    cells, transitions = _cells()
+    summary = building_summary(cells, transitions)
+    assert summary["cells"] == 3 and summary["transitions"] == 2
+    assert summary["cells_per_level"] == {'G': 1, '1': 2}
+    assert summary["degree"]["histogram"] == {0: 1, 1: 2}
+    assert (summary["isolated"], summary["isolated_ids"]) == (1, ['c'])
+    assert (summary["level_conflicts"], summary["conflict_ids"]) == (1, ['b'])
+    text = format_summary(summary)
+    assert "Isolated: 1 (c)" in text and "Cells per floor: G=1, 1=2" in text
+
+def test_level_conflicts_match_semantics_warning(sample_geojson, caplog):
+    with caplog.at_level("WARNING"):
+        result = convert_features(sample_geojson)
+    n = int(level_conflicts(result.cell_spaces).sum())
+    assert (f"Conflicting floor values in {n} cells" in caplog.text) == (n > 0)
+    assert result.summary()["level_conflicts"] == n
+
+def test_level_conflicts_recorded_by_semantics(monkeypatch):
+    import geopandas as gpd
+    from indoorgml_converter import converter
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+    from indoorgml_converter.engines.semantic_engine import attach_semantics
+
+    cells, _ = _cells()
+    gdf = gpd.GeoDataFrame([{"id": c["id"], **c["properties"], "geometry": c["geometry"]}
+                            for c in cells], geometry="geometry")
+    store = attach_semantics(CellSpaceStore.from_gdf(gdf))
+    assert store.conflicts.tolist() == [False, True, False]
+
+    # the report reads what attach_semantics found instead of detecting again
+    monkeypatch.setattr(converter, "levels_from_columns", None)
+    assert level_conflicts(store).tolist() == [False, True, False]
+    # an edited cell drops its flag with its cached level
+    store[1]["properties"]["floor"] = "1"
+    assert level_conflicts(store).tolist() == [False, False, False]
+
+    # plain cell dicts carry their flags in LevelProperties
+    cells = attach_semantics(_cells()[0])
+    assert level_conflicts(cells).tolist() == [False, True, False]
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_write_report_rows(tmp_path, suffix):
+    cells, transitions = _cells()
+    path = tmp_path / f"cells{suffix}"
+    assert write_report(cells, transitions, path) == 3
+    if suffix == ".csv":
+        rows = list(csv.DictReader(path.open()))
+    else:
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["id"] for r in rows] == ['a', 'b', 'c']
+    assert rows[0]["neighbors"] == 'b' and rows[2]["neighbors"] == ''
+    assert rows[0]["name"] == 'A' and rows[1]["name"] in (None, '')
+
+    edges = tmp_path / f"edges{suffix}"
+    assert write_report(cells, transitions, edges, kind="transitions") == 1
+
+def test_write_report_parquet_and_empty(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    cells, transitions = _cells()
+    write_report(cells, transitions, tmp_path / "cells.parquet", chunk_size=2)
+    table = pq.read_table(tmp_path / "cells.parquet")
+    assert table.column("degree").to_pylist() == [1, 1, 0]
+
+    assert write_report(cells, [], tmp_path / "none.parquet", kind="transitions") == 0
+    assert pq.read_table(tmp_path / "none.parquet").num_rows == 0
+    with pytest.raises(ValueError):
+        write_report(cells, transitions, tmp_path / "cells.xlsx")
@@ -1,4 +1,6 @@
 # tests/test_semantic_engine.py
+from pathlib import Path
+
 from indoorgml_converter.engines.semantic_engine import attach_semantics
 from indoorgml_converter.converter import detect_level
 
@@ -12,3 +14,84 @@ def test_attach_semantics_backfills():
     attach_semantics([cs])
     for key in ("floor_name","level_name","floor","level"):
         assert cs["properties"][key] == "None" or cs["properties"][key] == level
+
+def test_level_is_cached_and_invalidated():
+    import geopandas as gpd
+    from shapely.geometry import Point
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+    from indoorgml_converter.engines.semantic_engine import cell_level, cell_levels
+
+    store = CellSpaceStore.from_gdf(gpd.GeoDataFrame(
+        [{"id":"a","level":"2","geometry":Point(0,0)},
+         {"id":"b","z":-1.0,"geometry":Point(1,1)}], geometry="geometry"))
+    attach_semantics(store)
+    assert list(store.levels) == ["2", "B"]
+    assert store[0]["level"] == "2"
+
+    # editing the properties drops the cached level
+    store[1]["properties"]["name"] = "hall"
+    assert store.levels[1] is None
+    store[0]["properties"] = {"level": "3rd"}
+    assert cell_levels(store) == ["3", "B"]
+
+    # a plain dict can't tell when its properties change, so nothing is cached
+    cs = {"id":"c","properties": {"floor":"ground"}}
+    assert cell_level(cs) == "G" and "level" not in cs
+    cs["properties"]["floor"] = "2nd"
+    assert cell_level(cs) == "2"
+
+def test_plain_cells_keep_the_level_of_their_rules():
+    import pickle
+    from indoorgml_converter.engines.semantic_engine import cell_conflicts, cell_level
+
+    rules = {"floor": {"keys": ["etage", "stock"], "fill": []}}
+    cells = [{"id":"a","properties": {"etage":"upper","name":"Lab"}},
+             {"id":"b","properties": {"etage":"upper","stock":"lower"}}]
+    attach_semantics(cells, rules=rules)
+    assert [cell_level(cs) for cs in cells] == ["upper", "upper"]
+    assert cell_conflicts(cells).tolist() == [False, True]
+
+    # a write drops the cached level and conflict; the rules stay
+    props = cells[1]["properties"]
+    props["etage"] = "lower"
+    assert (props.level, props.conflict) == (None, False)
+    assert cell_level(cells[1]) == "lower"
+    copy = pickle.loads(pickle.dumps(cells[0]))
+    assert cell_level(copy) == "upper" and copy["properties"] == cells[0]["properties"]
+
+def test_store_rules_run_in_bulk_like_per_cell():
+    from indoorgml_converter.engines.geometry_engine import CellSpaceStore
+    from indoorgml_converter.engines.semantic_engine import cell_level
+    from indoorgml_converter.io_utils import load_features
+
+    gdf = load_features(Path(__file__).parent.parent / "resources" / "sample_312_level2.geojson")
+    store = attach_semantics(CellSpaceStore.from_gdf(gdf))
+    cells = attach_semantics(CellSpaceStore.from_gdf(gdf).to_dicts())
+    # nothing was copied into per-cell dicts
+    assert store.n_materialized == 0
+    for cs, ref in zip(store, cells):
+        assert list(cs["properties"].items()) == list(ref["properties"].items())
+        assert cs["level"] == cell_level(ref)
+
+def test_custom_rule_table(tmp_path):
+    import pytest
+    from indoorgml_converter.engines.semantic_engine import cell_level, load_rules
+
+    pytest.importorskip("yaml")
+    path = tmp_path / "rules.yaml"
+    path.write_text(
+        "floor:\n  keys: [etage]\n  fill: [floor]\n"
+        "name:\n  target: name\n  sources:\n"
+        "    - {column: titel, normalize: strip}\n"
+        "feature: null\n")
+    rules = load_rules(path)
+    cs = {"id":"x","properties": {"etage":"2nd","titel":" Lab ","type":"room"}}
+    attach_semantics([cs], rules=rules)
+    assert cs["properties"] == {"etage":"2nd","titel":" Lab ","type":"room",
+                                "floor":"2","name":"Lab"}
+    assert cell_level(cs) == "2"
+
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"name": {"target": "name", "sources": [{"column": "a", "when": "often"}]}}')
+    with pytest.raises(ValueError):
+        attach_semantics([cs], rules=load_rules(bad))
@@ -0,0 +1,120 @@
+# tests/test_server.py
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from indoorgml_converter.converter import convert_features
+from indoorgml_converter.server import ConversionService, UnknownBuilding, make_server
+
+SAMPLE = Path(__file__).parent.parent / "resources" / "sample.geojson"
+
+def _collection():
+    return json.loads(SAMPLE.read_text(encoding="utf-8"))
+
+def _square(fid, x, y, size=4, **props):
+    ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": {"id": fid, "floor_name": "1st", **props}}
+
+def test_update_matches_full_conversion():
+    service = ConversionService()
+    collection = _collection()
+    service.convert("b", collection)
+
+    features = collection["features"]
+    moved = dict(features[0], geometry=_square("x", 100, 100)["geometry"])
+    removed = features[1]["properties"]["id"]
+    new = _square("new-room", 4, 0)
+    building, changes = service.update("b", [moved, new], [removed])
+    assert changes == {"added": 1, "modified": 1, "removed": 1}
+
+    edited = [moved] + features[2:] + [new]
+    expected = convert_features({"type": "FeatureCollection", "features": edited})
+    assert building.xml_bytes() == expected.xml_bytes()
+
+    # a second edit reuses the same spatial index
+    index = building.index
+    building, _ = service.update("b", [], [new["properties"]["id"]])
+    assert building.index is index
+    expected = convert_features({"type": "FeatureCollection", "features": edited[:-1]})
+    assert building.xml_bytes() == expected.xml_bytes()
+
+def test_update_rebuilds_other_topologies():
+    service = ConversionService(topology="walls")
+    collection = _collection()
+    service.convert("b", collection)
+
+    features = collection["features"]
+    new = _square("new-room", 4, 0)
+    building, changes = service.update("b", [new], [features[0]["properties"]["id"]])
+    assert changes == {"added": 1, "modified": 0, "removed": 1}
+    assert building.index is None
+    expected = convert_features({"type": "FeatureCollection",
+                                 "features": features[1:] + [new]}, topology="walls")
+    assert building.xml_bytes() == expected.xml_bytes()
+
+def test_update_rejects_features_without_id():
+    service = ConversionService()
+    service.convert("b", _collection())
+    feature = _square("x", 0, 0)
+    del feature["properties"]["id"]
+    with pytest.raises(ValueError):
+        service.update("b", [feature])
+
+def test_lru_eviction():
+    service = ConversionService(max_buildings=2)
+    for name in ("a", "b"):
+        service.convert(name, [_square("r", 0, 0)])
+    service.get("a")
+    service.convert("c", [_square("r", 0, 0)])
+    assert "a" in service and "c" in service and "b" not in service
+    with pytest.raises(UnknownBuilding):
+        service.get("b")
+
+@pytest.fixture
+def server():
+    srv = make_server(ConversionService(), port=0, max_concurrent=1, queue_timeout=0.1)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def _request(srv, method, path, payload=None):
+    url = "http://%s:%d%s" % (*srv.server_address[:2], path)
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def test_http_round_trip(server):
+    status, body = _request(server, "POST", "/buildings/b", _collection())
+    assert status == 200
+    assert body == convert_features(_collection()).xml_bytes()
+
+    status, body = _request(server, "PATCH", "/buildings/b?format=json",
+                            {"upsert": [_square("new-room", 4, 0)]})
+    summary = json.loads(body)
+    assert status == 200 and summary["changes"]["added"] == 1
+    assert summary["cells"] == len(_collection()["features"]) + 1
+
+    status, body = _request(server, "GET", "/buildings/b?precision=1")
+    assert status == 200 and body.startswith(b"<?xml")
+    assert _request(server, "GET", "/health")[0] == 200
+    assert _request(server, "DELETE", "/buildings/b")[0] == 200
+    assert _request(server, "GET", "/buildings/b")[0] == 404
+    assert _request(server, "POST", "/buildings/b", None)[0] == 400
+
+def test_http_busy_when_slots_taken(server):
+    server.slots.acquire()
+    try:
+        assert _request(server, "GET", "/buildings/b")[0] == 503
+    finally:
+        server.slots.release()
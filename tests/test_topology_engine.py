@@ -15,3 +15,200 @@ def test_build_transitions_touches():
     assert ("a","b") in transitions and ("b","a") in transitions
     assert ("b","c") in transitions and ("c","b") in transitions
     assert not any(pair[0]=="a" and pair[1]=="c" for pair in transitions)
+
+def test_strtree_matches_bruteforce(building_geojson):
+    from indoorgml_converter.io_utils import load_features
+    from indoorgml_converter.engines.geometry_engine import build_cell_spaces
+
+    cell_spaces = build_cell_spaces(load_features(building_geojson))
+    fast = build_transitions(cell_spaces, method="strtree")
+    slow = build_transitions(cell_spaces, method="bruteforce")
+    assert fast == slow
+
+def test_build_transitions_unknown_method():
+    import pytest
+    with pytest.raises(ValueError):
+        build_transitions([], method="nope")
+
+def test_build_floor_transitions_partitions_and_links_stairs():
+    from indoorgml_converter.engines.topology_engine import build_floor_transitions
+
+    sq = lambda x: Polygon([(x,0),(x+1,0),(x+1,1),(x,1)])
+    cell_spaces = [
+        {"id":"g1","geometry":sq(0),"properties":{"level":"0"}},
+        {"id":"g2","geometry":sq(1),"properties":{"level":"0","feature":"stairs"}},
+        {"id":"f1","geometry":sq(0),"properties":{"level":"1"}},
+        {"id":"f2","geometry":sq(1),"properties":{"level":"1","feature":"stairs"}},
+    ]
+    transitions = build_floor_transitions(cell_spaces)
+    assert ("g1","g2") in transitions and ("f1","f2") in transitions
+    # stacked rooms touch in 2D but live on different floors
+    assert ("g1","f2") not in transitions
+    # stairs connect the consecutive floors
+    assert ("g2","f2") in transitions and ("f2","g2") in transitions
+    assert build_floor_transitions(cell_spaces, workers=2) == transitions
+
+def test_float_and_negative_floors_link_stairs():
+    import pytest
+    from indoorgml_converter.converter import floor_sort_key
+    from indoorgml_converter.engines.topology_engine import build_floor_transitions
+
+    # float columns come through as "2.0"; negative floors sort below G
+    assert floor_sort_key("2.0") == floor_sort_key("2") == 2
+    assert sorted(["3.0", "G", "-3", "1.0", "B", "roof"], key=floor_sort_key) == \
+        ["-3", "B", "G", "1.0", "3.0", "roof"]
+
+    sq = Polygon([(0,0),(1,0),(1,1),(0,1)])
+    def stairs(levels):
+        return build_floor_transitions([
+            {"id":f"s{i}","geometry":sq,"properties":{"level":lvl,"feature":"stairs"}}
+            for i, lvl in enumerate(levels)])
+
+    expected = stairs(["1", "2", "3"])
+    assert ("s0","s1") in expected and ("s1","s2") in expected
+    assert ("s0","s2") not in expected
+    assert stairs([1.0, 2.0, 3.0]) == expected
+    assert stairs([-5.0, -4.0, -3.0]) == expected
+    assert stairs(["-5", "-4", "-3"]) == expected
+
+def test_build_transitions_workers_match_single_process():
+    # 6x6 grid of unit squares: lots of pairs straddle the tile seams
+    cell_spaces = [
+        {"id":f"{x}-{y}","geometry":Polygon([(x,y),(x+1,y),(x+1,y+1),(x,y+1)])}
+        for x in range(6) for y in range(6)
+    ]
+    assert build_transitions(cell_spaces, workers=2) == build_transitions(cell_spaces)
+
+def test_non_strtree_methods_ignore_workers():
+    from indoorgml_converter.engines.topology_engine import build_adjacency
+
+    cell_spaces = [
+        {"id":f"{x}-{y}","geometry":Polygon([(x,y),(x+1,y),(x+1,y+1),(x,y+1)])}
+        for x in range(3) for y in range(3)
+    ]
+    for method in ("walls", "bruteforce"):
+        single = build_adjacency(cell_spaces, method=method)
+        pooled = build_adjacency(cell_spaces, method=method, workers=2)
+        assert pooled.to_transitions() == single.to_transitions()
+    walls = build_adjacency(cell_spaces, method="walls", workers=2)
+    assert walls.weights is not None
+
+def test_stats_count_the_pairs_each_engine_tests():
+    from indoorgml_converter.engines.topology_engine import build_adjacency
+
+    cell_spaces = [
+        {"id":f"{x}-{y}","geometry":Polygon([(x,y),(x+1,y),(x+1,y+1),(x,y+1)])}
+        for x in range(3) for y in range(3)
+    ]
+    counts = {}
+    for method in ("strtree", "bruteforce", "walls"):
+        stats = {}
+        build_adjacency(cell_spaces, method=method, stats=stats)
+        counts[method] = stats["candidate_pairs"]
+    # bbox candidates include the 8 diagonal corner contacts
+    assert counts == {"strtree": 20, "bruteforce": 36, "walls": 12}
+
+def test_adjacency_graph_matches_transition_list():
+    from indoorgml_converter.engines.topology_engine import AdjacencyGraph, build_adjacency
+
+    sq = lambda x: Polygon([(x,0),(x+1,0),(x+1,1),(x,1)])
+    cell_spaces = [{"id":k,"geometry":sq(x)} for k, x in (("a",0),("b",1),("c",2),("d",5))]
+    graph = build_adjacency(cell_spaces)
+
+    assert isinstance(graph, AdjacencyGraph)
+    assert graph.to_transitions() == build_transitions(cell_spaces)
+    assert list(graph) == graph.to_transitions() and len(graph) == 4
+    assert graph.neighbors("b") == ["a","c"]
+    assert graph.degree("b") == 2 and graph.degree("d") == 0
+    assert ("a","b") in graph and ("a","c") not in graph
+
+    rebuilt = AdjacencyGraph.from_transitions(cell_spaces, graph.to_transitions())
+    assert rebuilt.to_transitions() == graph.to_transitions()
+
+def test_shared_walls_tolerates_noise_and_reports_length():
+    from indoorgml_converter.engines.topology_engine import build_adjacency, shared_walls
+
+    a = Polygon([(0,0),(1,0),(1,2),(0,2)])
+    # shares the x=1 wall with a, but drawn 1e-9 off
+    b = Polygon([(1+1e-9,0),(2,0),(2,2),(1+1e-9,2)])
+    c = Polygon([(5,5),(6,5),(6,6),(5,6)])
+    assert not a.touches(b)
+
+    pairs, lengths = shared_walls([a, b, c], tolerance=1e-6)
+    assert pairs.tolist() == [[0, 1]]
+    assert abs(lengths[0] - 2.0) < 1e-6
+
+    cell_spaces = [{"id":k,"geometry":g} for k, g in zip("abc", (a, b, c))]
+    graph = build_adjacency(cell_spaces, method="walls", wall_tolerance=1e-6)
+    assert graph.neighbors("a") == ["b"]
+    assert abs(graph.weight("b", "a") - 2.0) < 1e-6
+
+def test_update_adjacency_matches_full_rebuild():
+    from indoorgml_converter.engines.topology_engine import (
+        SpatialIndex, build_adjacency, update_adjacency,
+    )
+
+    sq = lambda x, y=0: Polygon([(x,y),(x+1,y),(x+1,y+1),(x,y+1)])
+    cells = [{"id":f"r{x}","geometry":sq(x)} for x in range(5)]
+    graph = build_adjacency(cells)
+    index = SpatialIndex(cells)
+
+    # move r4 away, drop r1, add a room on top of r0
+    edited = [c for c in cells if c["id"] != "r1"]
+    edited[-1] = {"id":"r4","geometry":sq(10)}
+    edited.append({"id":"up","geometry":sq(0, 1)})
+    updated = update_adjacency(edited, graph, added={"up"}, removed={"r1"},
+                               modified={"r4"}, index=index)
+
+    assert updated.to_transitions() == build_adjacency(edited).to_transitions()
+    assert updated.neighbors("r0") == ["up"]
+    assert updated.neighbors("r4") == []
+    assert len(index) == len(edited)
+
+def test_update_adjacency_keeps_index_rows_across_edits():
+    from shapely.geometry import MultiPolygon
+    from indoorgml_converter.engines.topology_engine import (
+        SpatialIndex, build_adjacency, update_adjacency,
+    )
+
+    sq = lambda x, y=0: Polygon([(x,y),(x+1,y),(x+1,y+1),(x,y+1)])
+    cells = [{"id":f"r{x}","geometry":sq(x)} for x in range(8)]
+    cells.insert(3, {"id":"r2","geometry":sq(2, 1)})   # r2 has two parts
+    graph = build_adjacency(cells)
+    index = SpatialIndex(cells)
+
+    def edit(cells, replace=(), drop=(), new=()):
+        out, placed = [], set()
+        for c in cells:
+            if c["id"] in drop:
+                continue
+            if c["id"] in replace:
+                if c["id"] not in placed:
+                    out += replace[c["id"]]
+                    placed.add(c["id"])
+                continue
+            out.append(c)
+        return out + list(new)
+
+    steps = [
+        # r2 goes down to one part, r5 is dropped, two rooms on top
+        dict(replace={"r2": [{"id":"r2","geometry":sq(2)}]}, drop={"r5"},
+             new=[{"id":"a","geometry":sq(0, 1)}, {"id":"b","geometry":sq(6, 1)}]),
+        # r0 grows a second part, a is dropped again
+        dict(replace={"r0": [{"id":"r0","geometry":sq(0)},
+                             {"id":"r0","geometry":sq(0, -1)}]}, drop={"a"}),
+        # everything at once, with a multi-part room next to r7
+        dict(replace={"r7": [{"id":"r7","geometry":sq(7, 1)}]}, drop={"r1", "r3"},
+             new=[{"id":"c","geometry":MultiPolygon([sq(8), sq(7, 2)])}]),
+    ]
+    for k, step in enumerate(steps):
+        edited = edit(cells, **step)
+        graph = update_adjacency(edited, graph, added={c["id"] for c in step.get("new", ())},
+                                 removed=step.get("drop", ()),
+                                 modified=step.get("replace", {}).keys(), index=index)
+        assert graph.to_transitions() == build_adjacency(edited).to_transitions()
+        assert graph.ids == [c["id"] for c in edited]
+        assert index.rows("r4") == [graph.ids.index("r4")]
+        cells = edited
+        if k == 0:
+            index.rebuild()  # fold the pending edits in between two updates
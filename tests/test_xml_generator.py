@@ -1,7 +1,10 @@
 # tests/test_xml_generator.py
+import io
 import xml.etree.ElementTree as ET
+
+import pytest
 from shapely.geometry import Point, Polygon
-from indoorgml_converter.engines.xml_generator import generate_indoor_gml
+from indoorgml_converter.engines.xml_generator import generate_indoor_gml, write_indoor_gml
 
 def test_generate_indoor_gml_basic():
     cell_spaces = [
@@ -15,3 +18,63 @@ def test_generate_indoor_gml_basic():
     # check our r1 appears in XML
     xml_str = ET.tostring(root, encoding="unicode")
     assert "r1" in xml_str
+
+def _tree_bytes(cell_spaces, transitions):
+    buf = io.BytesIO()
+    ET.ElementTree(generate_indoor_gml(cell_spaces, transitions)).write(
+        buf, encoding="utf-8", xml_declaration=True)
+    return buf.getvalue()
+
+def _stream_bytes(cell_spaces, transitions, chunk_size):
+    buf = io.BytesIO()
+    write_indoor_gml(cell_spaces, transitions, buf, chunk_size=chunk_size)
+    return buf.getvalue()
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_write_indoor_gml_matches_tree_writer(chunk_size):
+    cell_spaces = [
+        {"id":"r1","geometry":Polygon([(0,0),(1,0),(1,1),(0,1)]),
+         "properties":{"name":"Café <A&B>","note":'say "hi"'}},
+        {"id":"d1","geometry":Point(0.5, 1),"properties":{}},
+    ]
+    transitions = [("r1","d1"), ("d1","r1")]
+    assert _stream_bytes(cell_spaces, transitions, chunk_size) \
+        == _tree_bytes(cell_spaces, transitions)
+    # an empty document is a self-closing root
+    assert _stream_bytes([], [], chunk_size) == _tree_bytes([], [])
+
+def test_write_indoor_gml_matches_on_fixtures(building_geojson):
+    from indoorgml_converter.converter import _load_cells
+    from indoorgml_converter.engines.topology_engine import build_adjacency
+
+    cell_spaces = _load_cells(building_geojson, "gdal")
+    graph = build_adjacency(cell_spaces)
+    assert _stream_bytes(cell_spaces, graph, 7) == _tree_bytes(cell_spaces, graph)
+
+def test_pos_lists_full_repr_and_precision():
+    from shapely.geometry import LineString, MultiPoint
+    from indoorgml_converter.engines.xml_generator import pos_lists
+
+    geoms = [Polygon([(0,0),(0.1+0.2,0),(1,1e-7)]), Point(1/3, 2),
+             LineString([(-1.25,5),(3,4)]), MultiPoint([(0,0)])]
+    assert pos_lists(geoms) == [
+        "0.0 0.0 0.30000000000000004 0.0 1.0 1e-07 0.0 0.0",
+        "0.3333333333333333 2.0", "-1.25 5.0 3.0 4.0", ""]
+    assert pos_lists(geoms, precision=3)[:2] == [
+        "0.0 0.0 0.3 0.0 1.0 0.0 0.0 0.0", "0.333 2.0"]
+
+def test_parallel_writer_matches_serial(building_geojson):
+    from indoorgml_converter.converter import _load_cells
+    from indoorgml_converter.engines.topology_engine import build_adjacency
+
+    cell_spaces = _load_cells(building_geojson, "gdal")
+    graph = build_adjacency(cell_spaces)
+    buf = io.BytesIO()
+    write_indoor_gml(cell_spaces, graph, buf, chunk_size=4, precision=6, workers=2)
+    serial = io.BytesIO()
+    write_indoor_gml(cell_spaces, graph, serial, chunk_size=4, precision=6)
+    assert buf.getvalue() == serial.getvalue()
+
+    empty = io.BytesIO()
+    write_indoor_gml([], [], empty, workers=2)
+    assert empty.getvalue() == _tree_bytes([], [])